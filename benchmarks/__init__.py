@@ -0,0 +1,11 @@
+"""Benchmarks of the client hot paths
+
+Run against an in-memory fake of the Admin API served by a separate
+process, so that the memory figures are those of the client alone:
+
+```
+python -m benchmarks
+python -m benchmarks paginate get_full_list --size 1000000
+python -m benchmarks --save
+```
+"""
@@ -0,0 +1,282 @@
+"""Benchmark cases
+
+A case seeds the fake Admin API, builds its input and runs the measured
+coroutine, which returns the number of entities processed.
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+from typing import Any
+
+import yaml
+
+from kong.client import Kong
+from kong.codec import JsonCodec, default_codec
+from kong.fake import FakeKong
+from kong.load import load
+
+PLUGINS = (
+    "cors",
+    "correlation-id",
+    "rate-limiting",
+    "request-transformer",
+    "response-transformer",
+)
+
+
+class Case:
+    """A benchmark case
+
+    :param sizes: number of entities of a default run
+    :param large: number of entities of a large run
+    :param server: the case sends requests to the fake Admin API
+    """
+
+    sizes: tuple[int, ...] = (10_000, 100_000)
+    large: tuple[int, ...] = (1_000_000,)
+    server = True
+    concurrency = 10
+
+    async def seed(self, fake: FakeKong, size: int) -> None:
+        """Populate the fake Admin API, not measured"""
+
+    def prepare(self, size: int) -> Any:
+        """Build the input of :meth:`run`, not measured"""
+
+    async def run(self, cli: Kong, size: int, data: Any) -> int:
+        raise NotImplementedError
+
+
+class Paginate(Case):
+    async def seed(self, fake: FakeKong, size: int) -> None:
+        fake.seed("consumers", consumers(size))
+
+    async def run(self, cli: Kong, size: int, data: Any) -> int:
+        count = 0
+        async for _ in cli.consumers.paginate():
+            count += 1
+        return count
+
+
+class PaginateRaw(Paginate):
+    async def run(self, cli: Kong, size: int, data: Any) -> int:
+        count = 0
+        async for _ in cli.consumers.paginate(raw=True):
+            count += 1
+        return count
+
+
+class GetFullList(Paginate):
+    async def run(self, cli: Kong, size: int, data: Any) -> int:
+        return len(await cli.consumers.get_full_list())
+
+
+class ApplyServices(Case):
+    """Services with two routes and a plugin each"""
+
+    sizes = (1_000,)
+    large = (10_000,)
+    reconcile = False
+
+    def prepare(self, size: int) -> Any:
+        return dict(services=services(size))
+
+    async def run(self, cli: Kong, size: int, data: Any) -> int:
+        await cli.apply_json(data, reconcile=self.reconcile)
+        return size
+
+
+class ApplyServicesReconcile(ApplyServices):
+    """Re-apply an unchanged configuration of services"""
+
+    reconcile = True
+
+    async def seed(self, fake: FakeKong, size: int) -> None:
+        async with Kong(url=fake.url, concurrency=self.concurrency) as cli:
+            await cli.apply_json(self.prepare(size))
+
+
+class ApplyStream(ApplyServices):
+    """Apply services while parsing them from a YAML file"""
+
+    def prepare(self, size: int) -> Any:
+        return yaml_file(dict(services=services(size)))
+
+    async def run(self, cli: Kong, size: int, data: Any) -> int:
+        try:
+            with open(data) as stream:
+                result = await cli.apply_stream(load(stream))
+        finally:
+            os.remove(data)
+        return result["services"]
+
+
+class ApplyConsumers(Case):
+    """Consumers with two groups and a key-auth credential each"""
+
+    sizes = (1_000,)
+    large = (10_000,)
+
+    def prepare(self, size: int) -> Any:
+        return dict(
+            consumers=[
+                dict(
+                    username=f"consumer-{i}",
+                    groups=["read", f"group-{i % 10}"],
+                    auths=[dict(type="key-auth", config=dict(key=f"key-{i}"))],
+                )
+                for i in range(size)
+            ]
+        )
+
+    async def run(self, cli: Kong, size: int, data: Any) -> int:
+        await cli.apply_json(data)
+        return size
+
+
+class ApplyPlugins(Case):
+    """Services with five plugins each"""
+
+    sizes = (500,)
+    large = (5_000,)
+
+    def prepare(self, size: int) -> Any:
+        return dict(
+            services=[
+                dict(
+                    name=f"service-{i}",
+                    host=f"upstream-{i}.local",
+                    plugins=[dict(name=name, config={}) for name in PLUGINS],
+                )
+                for i in range(size)
+            ]
+        )
+
+    async def run(self, cli: Kong, size: int, data: Any) -> int:
+        await cli.apply_json(data)
+        return size * len(PLUGINS)
+
+
+class Wrap(Case):
+    """Wrap listed entities in :class:`.KongEntity` objects"""
+
+    sizes = (100_000,)
+    server = False
+
+    def prepare(self, size: int) -> Any:
+        return list(consumers(size))
+
+    async def run(self, cli: Kong, size: int, data: Any) -> int:
+        wrap = cli.consumers.wrap
+        return len([wrap(d) for d in data])
+
+
+class Decode(Case):
+    """Decode pages of entities with the default codec"""
+
+    sizes = (10_000,)
+    server = False
+    page = 1000
+
+    def codec(self) -> JsonCodec:
+        return default_codec()
+
+    def prepare(self, size: int) -> Any:
+        codec = self.codec()
+        entities = list(services(size))
+        return [
+            codec.encode(dict(data=entities[i : i + self.page], next=None))
+            for i in range(0, size, self.page)
+        ]
+
+    async def run(self, cli: Kong, size: int, data: Any) -> int:
+        decode = self.codec().decode
+        return sum(len(decode(page)["data"]) for page in data)
+
+
+class DecodeJson(Decode):
+    """Decode pages of entities with the standard library codec"""
+
+    def codec(self) -> JsonCodec:
+        return JsonCodec()
+
+
+class LoadYaml(Case):
+    """Stream the entries of a YAML file"""
+
+    sizes = (10_000,)
+    large = (100_000,)
+    server = False
+
+    def prepare(self, size: int) -> Any:
+        return yaml_file(dict(services=services(size)))
+
+    async def run(self, cli: Kong, size: int, data: Any) -> int:
+        try:
+            with open(data) as stream:
+                return self.load(stream)
+        finally:
+            os.remove(data)
+
+    def load(self, stream: Any) -> int:
+        return sum(1 for _ in load(stream))
+
+
+class LoadYamlWhole(LoadYaml):
+    """Load a YAML file in a single document"""
+
+    def load(self, stream: Any) -> int:
+        loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+        return len(yaml.load(stream, Loader=loader)["services"])
+
+
+def yaml_file(config: dict) -> str:
+    """Write a configuration to a temporary YAML file and return its path"""
+    fd, path = tempfile.mkstemp(suffix=".yaml")
+    with os.fdopen(fd, "w") as stream:
+        dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+        yaml.dump(config, stream, Dumper=dumper)
+    return path
+
+
+def consumers(size: int) -> Any:
+    return (
+        dict(username=f"consumer-{i}", custom_id=None, tags=["benchmark"])
+        for i in range(size)
+    )
+
+
+def services(size: int) -> list[dict]:
+    return [
+        dict(
+            name=f"service-{i}",
+            host=f"upstream-{i}.local",
+            port=8080,
+            tags=["benchmark"],
+            routes=[
+                dict(name=f"route-{i}-{j}", paths=[f"/service-{i}/{j}"])
+                for j in range(2)
+            ],
+            plugins=[dict(name="cors", config={})],
+        )
+        for i in range(size)
+    ]
+
+
+CASES: dict[str, Case] = {
+    "paginate": Paginate(),
+    "paginate_raw": PaginateRaw(),
+    "get_full_list": GetFullList(),
+    "apply_services": ApplyServices(),
+    "apply_services_reconcile": ApplyServicesReconcile(),
+    "apply_stream": ApplyStream(),
+    "apply_consumers": ApplyConsumers(),
+    "apply_plugins": ApplyPlugins(),
+    "wrap": Wrap(),
+    "decode": Decode(),
+    "decode_json": DecodeJson(),
+    "load_yaml": LoadYaml(),
+    "load_yaml_whole": LoadYamlWhole(),
+}
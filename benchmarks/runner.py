@@ -0,0 +1,209 @@
+"""Run the benchmark cases and compare them with the stored baselines
+
+Each case runs twice in a fresh interpreter: once to measure wall time,
+requests and peak RSS, and once under :mod:`tracemalloc` to measure the
+peak of memory allocated by the measured coroutine. Wall times depend on
+the machine, baselines should be saved and compared on the same one.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import json
+import multiprocessing
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from multiprocessing.connection import Connection
+from pathlib import Path
+from typing import Any
+
+from kong.client import Kong
+from kong.fake import FakeKong
+
+from .cases import CASES
+
+ROOT = Path(__file__).parent
+BASELINE = ROOT / "baseline.json"
+MB = 1024 * 1024
+# fields compared with the baseline, within the tolerance
+COMPARED = ("wall", "rss_mb", "alloc_mb")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks", description="Benchmark the kong client"
+    )
+    parser.add_argument("cases", nargs="*", metavar="CASE", help=", ".join(CASES))
+    parser.add_argument("--size", type=int, action="append", help="entities")
+    parser.add_argument("--large", action="store_true", help="run large sizes")
+    parser.add_argument("--latency", type=float, default=0, help="server latency")
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--save", action="store_true", help="save as baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--json", action="store_true", help="output JSON")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--trace", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if unknown := set(args.cases).difference(CASES):
+        parser.error("unknown cases: %s" % ", ".join(sorted(unknown)))
+    if args.worker:
+        size = args.size[0]
+        result = asyncio.run(measure(args.worker, size, args.latency, args.trace))
+        print(json.dumps(result))
+        return
+    results = []
+    for name in args.cases or CASES:
+        case = CASES[name]
+        sizes = args.size or case.sizes + (case.large if args.large else ())
+        for size in sizes:
+            result = worker(name, size, args.latency)
+            result["alloc_mb"] = worker(name, size, args.latency, True)["alloc_mb"]
+            results.append(result)
+            if not args.json:
+                print(row(result), flush=True)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    if args.save:
+        save(args.baseline, results)
+    elif args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())["results"]
+        if regressions := compare(results, baseline, args.tolerance):
+            print("\nRegressions:", *regressions, sep="\n  ")
+            sys.exit(1)
+
+
+def worker(name: str, size: int, latency: float, trace: bool = False) -> dict:
+    """Run a case in a fresh interpreter"""
+    command = [sys.executable, "-m", "benchmarks", "--worker", name]
+    command.extend(("--size", str(size), "--latency", str(latency)))
+    if trace:
+        command.append("--trace")
+    output = subprocess.run(
+        command, cwd=ROOT.parent, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+async def measure(name: str, size: int, latency: float, trace: bool) -> dict:
+    case = CASES[name]
+    data = case.prepare(size)
+    server = FakeServer(name, size, latency) if case.server else None
+    url = server.start() if server else "http://127.0.0.1:8001"
+    peak = 0
+    try:
+        async with Kong(url=url, concurrency=case.concurrency) as cli:
+            gc.collect()
+            if trace:
+                tracemalloc.start()
+            start = time.perf_counter()
+            entities = await case.run(cli, size, data)
+            wall = time.perf_counter() - start
+            if trace:
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+    finally:
+        requests = server.stop() if server else 0
+    return dict(
+        case=name,
+        size=size,
+        entities=entities,
+        requests=requests,
+        wall=round(wall, 4),
+        rps=round(requests / wall, 1) if wall else 0,
+        rss_mb=round(peak_rss() / MB, 1),
+        alloc_mb=round(peak / MB, 2),
+    )
+
+
+class FakeServer:
+    """Fake Admin API seeded for a case and served by another process"""
+
+    def __init__(self, name: str, size: int, latency: float) -> None:
+        context = multiprocessing.get_context("spawn")
+        self.conn, child = context.Pipe()
+        self.process = context.Process(
+            target=serve, args=(name, size, latency, child), daemon=True
+        )
+
+    def start(self) -> str:
+        self.process.start()
+        return self.conn.recv()
+
+    def stop(self) -> int:
+        """Stop the server and return the number of requests it served"""
+        self.conn.send("stop")
+        requests = self.conn.recv()
+        self.process.join()
+        return requests
+
+
+def serve(name: str, size: int, latency: float, conn: Connection) -> None:
+    asyncio.run(serve_case(name, size, latency, conn))
+
+
+async def serve_case(name: str, size: int, latency: float, conn: Connection) -> None:
+    async with FakeKong(latency=latency) as fake:
+        await CASES[name].seed(fake, size)
+        fake.reset_stats()
+        conn.send(fake.url)
+        await asyncio.get_running_loop().run_in_executor(None, conn.recv)
+        conn.send(fake.calls)
+
+
+def peak_rss() -> int:
+    """Peak resident memory of the process in bytes"""
+    import resource
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def key(result: dict) -> str:
+    return f"{result['case']}[{result['size']}]"
+
+
+def row(result: dict) -> str:
+    return (
+        f"{key(result):36} {result['wall']:9.3f}s {result['requests']:8} req "
+        f"{result['rps']:9.1f} req/s {result['rss_mb']:8.1f} MB rss "
+        f"{result['alloc_mb']:8.2f} MB alloc"
+    )
+
+
+def compare(results: list[dict], baseline: dict, tolerance: float) -> list[str]:
+    """Regressions of results with respect to the baseline
+
+    More requests than the baseline are always a regression, time and memory
+    are regressions beyond the tolerance
+    """
+    regressions = []
+    for result in results:
+        if (base := baseline.get(key(result))) is None:
+            continue
+        if result["requests"] > base["requests"]:
+            regressions.append(
+                f"{key(result)} requests {base['requests']} -> {result['requests']}"
+            )
+        for field in COMPARED:
+            if result[field] > base[field] * (1 + tolerance):
+                regressions.append(
+                    f"{key(result)} {field} {base[field]} -> {result[field]}"
+                )
+    return regressions
+
+
+def save(path: Path, results: list[dict]) -> None:
+    """Save results in the baseline, keeping the baselines of other cases"""
+    data: dict[str, Any] = (
+        json.loads(path.read_text()) if path.exists() else dict(results={})
+    )
+    data["python"] = platform.python_version()
+    data["machine"] = platform.machine()
+    data["results"].update((key(result), result) for result in results)
+    data["results"] = dict(sorted(data["results"].items()))
+    path.write_text(json.dumps(data, indent=2) + "\n")
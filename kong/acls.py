@@ -2,7 +2,7 @@ from .components import CrudComponent, KongEntity
 
 
 class Acl(KongEntity):
-    pass
+    __slots__ = ()
 
 
 class Acls(CrudComponent[Acl]):
@@ -1,71 +1,155 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, cast
 
-from .components import CrudComponent, KongEntity
+from multidict import MultiDict
+
+from .components import CrudComponent, KongEntity, KongError
+from .context import ApplyContext
+from .utils import matches
 
 if TYPE_CHECKING:
+    from .client import Kong
     from .consumers import Consumer
 
+# endpoints listing the credentials of all consumers by authentication type
+CREDENTIAL_LISTS = {
+    "basic-auth": "basic-auths",
+    "hmac-auth": "hmac-auths",
+    "jwt": "jwts",
+    "key-auth": "key-auths",
+    "oauth2": "oauth2",
+}
+
+
+def form_data(data: dict) -> MultiDict:
+    """Form body of a credential, lists are sent as repeated ``key[]`` fields"""
+    form: MultiDict = MultiDict()
+    for key, value in data.items():
+        if isinstance(value, (list, tuple)):
+            form.extend((f"{key}[]", v) for v in value)
+        else:
+            form.add(key, value)
+    return form
+
 
 def auth_factory(consumer: Consumer, auth_type: str) -> ConsumerAuth:
-    known_types = {"basic-auth": BasicAuth, "key-auth": KeyAuth}
+    known_types = {"basic-auth": BasicAuth, "jwt": JwtAuth, "key-auth": KeyAuth}
     constructor = known_types.get(auth_type, ConsumerAuth)
-    return constructor(consumer, Auth, auth_type)
+    return consumer.child(constructor, Auth, auth_type)
+
+
+def all_credentials(cli: Kong, auth_type: str) -> CrudComponent[Auth]:
+    """Component listing the credentials of all consumers"""
+    return CrudComponent(cli, Auth, CREDENTIAL_LISTS.get(auth_type, auth_type))
 
 
 class Auth(KongEntity):
-    pass
+    __slots__ = ()
 
 
 class ConsumerAuth(CrudComponent[Auth]):
     unique_field: str = ""
+    # fields stored hashed, which cannot be compared with the configuration
+    hashed_fields: tuple[str, ...] = ()
 
     @property
     def url(self) -> str:
         return f"{self.root.url}/{self.name}"
 
     async def get_existing_id(self, creds_config: dict) -> str | None:
+        existing = await self.get_existing(creds_config)
+        return existing["id"] if existing else None
+
+    async def get_existing(
+        self, creds_config: dict, context: ApplyContext | None = None
+    ) -> dict | None:
+        """Return the credential with the same unique field as creds_config"""
+        unique = creds_config.get(self.unique_field)
+        if self.unique_field and unique is None:
+            # without it each apply would create another credential
+            raise KongError(f"{self.name} credential {self.unique_field} is required")
+        index = await self.index(context)
+        return None if unique is None else index.get(unique)
+
+    async def index(self, context: ApplyContext | None = None) -> dict[str, dict]:
+        """Credentials of the consumer indexed by their unique field
+
+        The index is built once per apply run from the full listing of the
+        consumer credentials or, in reconcile mode, of the credentials of
+        all consumers
+        """
         if not self.unique_field:
             raise NotImplementedError(
                 "Existence check not implemented for this type of\
                  authentication"
             )
-        cur_unique = creds_config[self.unique_field]
-        try:
-            return next(
-                cred
-                for cred in await self.get_list()
-                if cred[self.unique_field] == cur_unique
-            )["id"]
-        except StopIteration:
-            return None
-
-    async def create_or_update_credentials(self, creds_config: dict) -> Auth:
-        if existing_id := await self.get_existing_id(creds_config):
-            return await self.update_credentials(existing_id, data=creds_config)
+        context = self.apply_context(context)
+        return await context.memo(
+            ("credentials", self.list_create_url()), lambda: self.build_index(context)
+        )
+
+    async def build_index(self, context: ApplyContext) -> dict[str, dict]:
+        if context.reconcile:
+            groups = await context.children(
+                all_credentials(self.cli, self.name), "consumer"
+            )
+            credentials = groups.get(cast(KongEntity, self.root).id, [])
+        else:
+            credentials = [d async for d in self.paginate(raw=True, **context.scope)]
+        return {d[self.unique_field]: d for d in credentials}
+
+    async def create_or_update_credentials(
+        self, creds_config: dict, context: ApplyContext | None = None
+    ) -> Auth:
+        """Create a credential or update the existing one if it differs
+
+        Hashed fields are left out of the comparison, a credential which
+        differs only by them is not updated
+        """
+        context = self.apply_context(context)
+        existing = await self.get_existing(creds_config, context)
+        creds_config = context.owned(dict(creds_config))
+        compared = {
+            key: value
+            for key, value in creds_config.items()
+            if key not in self.hashed_fields
+        }
+        if existing is None:
+            auth = await self.create_credentials(data=form_data(creds_config))
+        elif matches(compared, existing):
+            return self.wrap(existing)
         else:
-            return await self.create_credentials(data=creds_config)
+            auth = await self.update_credentials(
+                existing["id"], data=form_data(creds_config)
+            )
+        index = await self.index(context)
+        index[auth[self.unique_field]] = auth.data
+        return auth
 
     async def update_credentials(self, id_: str, **kw: Any) -> Auth:
         url = f"{self.url}/{id_}"
 
-        return await self.cli.execute(
+        auth = await self.cli.execute(
             url,
             "patch",
             headers={"Content-Type": "application/x-www-form-urlencoded"},
             wrap=self.wrap,
             **kw,
         )
+        self.invalidate(url, *self.entity_urls(auth))
+        return auth
 
     async def create_credentials(self, **kw: Any) -> Auth:
-        return await self.cli.execute(
+        auth = await self.cli.execute(
             self.url,
             "post",
             headers={"Content-Type": "application/x-www-form-urlencoded"},
             wrap=self.wrap,
             **kw,
         )
+        self.invalidate(*self.entity_urls(auth))
+        return auth
 
     async def get_or_create(self) -> Auth:
         secrets = await self.get_list(limit=1)
@@ -74,7 +158,12 @@ class ConsumerAuth(CrudComponent[Auth]):
 
 class BasicAuth(ConsumerAuth):
     unique_field = "username"
+    hashed_fields = ("password",)
 
 
 class KeyAuth(ConsumerAuth):
     unique_field = "key"
+
+
+class JwtAuth(ConsumerAuth):
+    unique_field = "key"
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Iterable, NamedTuple
+
+if TYPE_CHECKING:
+    from .components import KongEntity
+
+
+class CacheEntry(NamedTuple):
+    expires: float
+    entity: KongEntity
+    keys: tuple[str, ...]
+
+
+class EntityCache:
+    """Read-through cache of Kong entities
+
+    Entities are cached by URL, an entity fetched by name is also cached
+    under its id URL and vice versa. Entries expire after ``ttl`` seconds
+    and the least recently used entries are evicted once ``maxsize``
+    entries are cached.
+
+    Attach it to a client to cache the entities returned by
+    :meth:`.CrudComponent.get` and :meth:`.CrudComponent.has`; writes
+    through the same client invalidate the cached entities, including the
+    children cascaded by Kong when deleting an entity.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 60) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict[str, Any]:
+        total = self.hits + self.misses
+        return dict(
+            size=len(self._entries),
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            hit_ratio=self.hits / total if total else 0.0,
+        )
+
+    def get(self, url: str) -> KongEntity | None:
+        entry = self._entries.get(url)
+        if entry is not None:
+            if entry.expires > time.monotonic():
+                self._entries.move_to_end(url)
+                self.hits += 1
+                return entry.entity
+            self.invalidate(url)
+        self.misses += 1
+        return None
+
+    def set(self, entity: KongEntity, urls: Iterable[str]) -> None:
+        keys = tuple(dict.fromkeys(urls))
+        for url in keys:
+            self.invalidate(url)
+        entry = CacheEntry(time.monotonic() + self.ttl, entity, keys)
+        for url in keys:
+            self._entries[url] = entry
+        while len(self._entries) > self.maxsize:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def invalidate(self, url: str, cascade: bool = False) -> None:
+        """Remove the entity cached at url and its aliases
+
+        :param cascade: also remove the cached entities nested under the
+            entity URLs or referencing the entity, as Kong deletes them
+            together with their parent
+        """
+        entry = self._entries.get(url)
+        self._remove(url)
+        if cascade:
+            urls = entry.keys if entry else (url,)
+            id_ = entry.entity.id if entry else url.rsplit("/", 1)[-1]
+            prefixes = tuple(f"{u}/" for u in urls)
+            for key, other in list(self._entries.items()):
+                if key.startswith(prefixes) or references(other.entity, id_):
+                    self._remove(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def _remove(self, url: str) -> None:
+        if entry := self._entries.pop(url, None):
+            for key in entry.keys:
+                self._entries.pop(key, None)
+
+
+def references(entity: KongEntity, id_: str) -> bool:
+    return any(
+        isinstance(value, dict) and value.get("id") == id_
+        for value in entity.data.values()
+    )
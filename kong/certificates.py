@@ -3,9 +3,11 @@ from .snis import Sni, Snis
 
 
 class Certificate(KongEntity):
+    __slots__ = ()
+
     @property
     def snis(self) -> Snis:
-        return Snis(self, Sni)
+        return self.child(Snis, Sni)
 
 
 class Certificates(CrudComponent[Certificate]):
@@ -1,6 +1,5 @@
 import asyncio
-import json
-from typing import Any, cast
+from typing import Any, AsyncIterator, cast
 
 import click
 import yaml as _yaml
@@ -9,14 +8,30 @@ from rich.table import Table
 
 from . import __version__
 from .client import Kong, KongError, default_admin_url
+from .codec import default_codec
 from .components import KongEntity
 from .consumers import Consumer
+from .dump import SECTIONS as DUMP_SECTIONS
+from .dump import dump as dump_state
+from .load import FORMATS as LOAD_FORMATS
+from .load import load, load_config
+from .nodes import is_dbless
+from .plan import Plan
 from .utils import local_ip
 
 admin_url = click.option(
     "--url", default=default_admin_url(), help="Kong Admin URL", show_default=True
 )
 
+admin_urls = click.option(
+    "--url",
+    "urls",
+    multiple=True,
+    default=[default_admin_url()],
+    help="Kong Admin URL, repeat it to apply to several nodes concurrently",
+    show_default=True,
+)
+
 as_json = click.option("--json", default=False, is_flag=True, help="Output as JSON")
 
 
@@ -38,14 +53,188 @@ def kong() -> None:
     is_flag=True,
     help="Clear objects not in configuration",
 )
-@admin_url
+@click.option(
+    "--reconcile",
+    default=False,
+    is_flag=True,
+    help="List the current state once and only write entities which differ",
+)
+@click.option(
+    "--incremental",
+    default=False,
+    is_flag=True,
+    help="Skip services and consumers unchanged since the last apply, "
+    "tracked by a hash tag",
+)
+@click.option(
+    "--owner",
+    help="Tag of the entities owned by the configuration, only entities "
+    "with the tag are listed, updated and cleared",
+)
+@click.option(
+    "--declarative",
+    default=False,
+    is_flag=True,
+    help="Load the whole configuration in a single request (DB-less nodes)",
+)
+@click.option(
+    "--detect-dbless",
+    default=False,
+    is_flag=True,
+    help="Detect DB-less nodes and load the whole configuration in a single "
+    "request to them, replacing their configuration",
+)
+@click.option(
+    "--concurrency",
+    type=click.IntRange(min=1),
+    help="Apply entities concurrently, with at most this number of requests in flight",
+)
+@click.option(
+    "--plan",
+    default=False,
+    is_flag=True,
+    help="Print the changes and the number of requests of a reconcile apply, "
+    "without applying them",
+)
+@click.option(
+    "--save-plan",
+    type=click.File("w"),
+    help="Save the plan to a file, to be applied with the apply-plan command",
+)
+@click.option(
+    "--timeout",
+    type=float,
+    help="Seconds after which a node is reported as failed, with several URLs",
+)
+@click.option(
+    "--stream",
+    default=False,
+    is_flag=True,
+    help="Apply entries while the file is parsed, for large files, and print "
+    "the number of entries applied rather than the entities",
+)
+@click.option(
+    "--format",
+    "format_",
+    type=click.Choice(LOAD_FORMATS),
+    help="Format of the file, inferred from its suffix by default - "
+    "JSON Lines for .jsonl and .ndjson files, YAML otherwise",
+)
+@admin_urls
 def yaml(
     yaml: click.File,
     clear: bool,
+    reconcile: bool,
+    incremental: bool,
+    owner: str | None,
+    declarative: bool,
+    detect_dbless: bool,
+    concurrency: int | None,
+    plan: bool,
+    save_plan: Any,
+    timeout: float | None,
+    stream: bool,
+    format_: str | None,
+    urls: tuple[str, ...],
+) -> None:
+    "Upload a configuration from a yaml or JSON Lines file"
+    plan = plan or save_plan is not None
+    # None detects DB-less nodes
+    dbless = True if declarative else (None if detect_dbless else False)
+    if plan and (declarative or detect_dbless or stream):
+        raise click.UsageError(
+            "--plan cannot be combined with --declarative, --detect-dbless "
+            "or --stream"
+        )
+    if len(urls) > 1:
+        if plan:
+            raise click.UsageError("A plan is computed for a single --url")
+        if stream:
+            raise click.UsageError("--stream applies to a single --url")
+        asyncio.run(
+            _yml_nodes(
+                yaml,
+                clear,
+                urls,
+                reconcile=reconcile,
+                incremental=incremental,
+                owner=owner,
+                declarative=dbless,
+                concurrency=concurrency,
+                timeout=timeout,
+                format_=format_,
+            )
+        )
+        return
+    asyncio.run(
+        _yml(
+            yaml,
+            clear,
+            urls[0],
+            reconcile=reconcile,
+            incremental=incremental,
+            owner=owner,
+            declarative=dbless,
+            concurrency=concurrency,
+            plan=plan,
+            save_plan=save_plan,
+            stream=stream,
+            format_=format_,
+        )
+    )
+
+
+@kong.command()
+@click.argument(
+    "plan",
+    type=click.File("r"),
+)
+@admin_url
+def apply_plan(plan: click.File, url: str) -> None:
+    "Apply a plan saved by the yaml command"
+    asyncio.run(_apply_plan(plan, url))
+
+
+@kong.command()
+@click.option(
+    "--format",
+    "format_",
+    type=click.Choice(["yaml", "json"]),
+    default="yaml",
+    help="Output format",
+    show_default=True,
+)
+@click.option(
+    "-o",
+    "--output",
+    type=click.File("w"),
+    default="-",
+    help="Output file, standard output by default",
+)
+@click.option(
+    "--section",
+    "sections",
+    type=click.Choice(DUMP_SECTIONS),
+    multiple=True,
+    help="Section to export, all sections by default",
+)
+@click.option(
+    "--concurrency",
+    type=click.IntRange(min=1),
+    help="Read entities concurrently, with at most this number of requests in flight",
+)
+@admin_url
+def dump(
+    format_: str,
+    output: Any,
+    sections: tuple[str, ...],
+    concurrency: int | None,
     url: str,
 ) -> None:
-    "Upload a configuration from a yaml file"
-    asyncio.run(_yml(yaml, clear, url))
+    "Export the current configuration in the format accepted by yaml"
+    asyncio.run(
+        _dump(output, url, format_, sections or DUMP_SECTIONS, concurrency=concurrency)
+    )
 
 
 @kong.command()
@@ -88,15 +277,143 @@ def key_auth(consumer: str, url: str) -> None:
     asyncio.run(_auth_key(consumer, url))
 
 
-async def _yml(yaml: Any, clear: bool, url: str) -> None:
-    async with Kong(url=url) as cli:
+async def _yml(
+    yaml: Any,
+    clear: bool,
+    url: str,
+    reconcile: bool = False,
+    incremental: bool = False,
+    owner: str | None = None,
+    declarative: bool | None = False,
+    concurrency: int | None = None,
+    plan: bool = False,
+    save_plan: Any = None,
+    stream: bool = False,
+    format_: str | None = None,
+) -> None:
+    async with Kong(url=url, concurrency=concurrency) as cli:
         try:
-            result = await cli.apply_json(_yaml.safe_load(yaml), clear=clear)
+            if plan:
+                planned = await cli.plan_json(
+                    load_config(yaml, format_),
+                    clear=clear,
+                    incremental=incremental,
+                    owner=owner,
+                )
+                if save_plan is not None:
+                    save_plan.write(default_codec().encode(planned.to_dict()).decode())
+                display_json(planned.summary())
+                return
+            if declarative is None:
+                declarative = await is_dbless(cli)
+            if declarative:
+                result = await cli.apply_declarative(load_config(yaml, format_))
+            elif stream:
+                # entries are applied while the file is parsed
+                result = await cli.apply_stream(
+                    load(yaml, format_),
+                    clear=clear,
+                    reconcile=reconcile,
+                    incremental=incremental,
+                    owner=owner,
+                )
+            else:
+                result = await cli.apply_json(
+                    load_config(yaml, format_),
+                    clear=clear,
+                    reconcile=reconcile,
+                    incremental=incremental,
+                    owner=owner,
+                )
             display_json(result)
         except KongError as exc:
             raise click.ClickException(str(exc)) from None
 
 
+async def _yml_nodes(
+    yaml: Any,
+    clear: bool,
+    urls: tuple[str, ...],
+    reconcile: bool = False,
+    incremental: bool = False,
+    owner: str | None = None,
+    declarative: bool | None = False,
+    concurrency: int | None = None,
+    timeout: float | None = None,
+    format_: str | None = None,
+) -> None:
+    async with Kong(url=urls[0], concurrency=concurrency) as cli:
+        config = load_config(yaml, format_)
+        results = await cli.apply_nodes(
+            config,
+            urls,
+            clear=clear,
+            reconcile=reconcile,
+            incremental=incremental,
+            owner=owner,
+            declarative=declarative,
+            timeout=timeout,
+        )
+        display_json([result.to_dict() for result in results])
+        if failed := [result.url for result in results if not result.ok]:
+            raise click.ClickException("Failed nodes: %s" % ", ".join(failed))
+
+
+async def _apply_plan(plan: Any, url: str) -> None:
+    async with Kong(url=url) as cli:
+        try:
+            saved = Plan.from_dict(default_codec().decode(plan.read()))
+            await cli.apply_plan(saved)
+            display_json(saved.summary())
+        except KongError as exc:
+            raise click.ClickException(str(exc)) from None
+
+
+async def _dump(
+    output: Any,
+    url: str,
+    format_: str = "yaml",
+    sections: tuple[str, ...] = DUMP_SECTIONS,
+    concurrency: int | None = None,
+) -> None:
+    async with Kong(url=url, concurrency=concurrency) as cli:
+        try:
+            entries = dump_state(cli, sections)
+            if format_ == "json":
+                await write_json(entries, output)
+            else:
+                await write_yaml(entries, output)
+        except KongError as exc:
+            raise click.ClickException(str(exc)) from None
+
+
+async def write_yaml(entries: AsyncIterator[tuple[str, dict]], output: Any) -> None:
+    """Write configuration entries as YAML, one entry at a time"""
+    section = None
+    async for name, entry in entries:
+        if name != section:
+            section = name
+            output.write(f"{name}:\n")
+        output.write(_yaml.safe_dump([entry], sort_keys=False))
+    if section is None:
+        output.write("{}\n")
+
+
+async def write_json(entries: AsyncIterator[tuple[str, dict]], output: Any) -> None:
+    """Write configuration entries as JSON, one entry at a time"""
+    codec = default_codec()
+    section = None
+    output.write("{")
+    async for name, entry in entries:
+        if name != section:
+            output.write(f'{"]," if section else ""}\n"{name}": [\n')
+            section = name
+        else:
+            output.write(",\n")
+        output.write(codec.encode(entry).decode())
+    output.write("\n]\n}\n" if section else "}\n")
+
+
 async def _services(url: str, as_json: bool = False, delete: str | None = None) -> None:
     async with Kong(url=url) as cli:
         try:
@@ -197,7 +514,7 @@ def str_value(data: dict, key: str) -> str:
 
 def display_json(data: Any) -> None:
     """Display data as JSON."""
-    click.echo(json.dumps(data, indent=2, default=kong_entity))
+    click.echo(default_codec().encode(data, default=kong_entity, indent=True).decode())
 
 
 def kong_entity(obj: Any) -> Any:
@@ -1,27 +1,67 @@
 from __future__ import annotations
 
+import asyncio
 import os
 import sys
-from typing import Any, Callable, Dict, Optional
+import time
+from contextlib import asynccontextmanager, nullcontext
+from functools import partial
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    Optional,
+    TypeVar,
+)
 
-from aiohttp import ClientResponse, ClientSession
+from aiohttp import (
+    BaseConnector,
+    ClientResponse,
+    ClientSession,
+    TCPConnector,
+    UnixConnector,
+)
+from yarl import URL
 
 from . import __version__
 from .acls import Acl, Acls
+from .cache import EntityCache
 from .certificates import Certificate, Certificates
+from .codec import JsonCodec, default_codec
 from .components import CrudComponent, KongError, KongResponseError
 from .consumers import Consumer, Consumers
+from .context import ApplyContext
+from .declarative import declarative_config
+from .metrics import MetricsSink, RequestTrace, entity_type, trace_config
+from .nodes import NodeResult, apply_node
+from .plan import Plan
 from .plugins import Plugin, Plugins
+from .retry import RETRY_ERRORS, CircuitBreaker, RetryPolicy
 from .routes import Route, Routes
 from .services import Service, Services
 from .snis import Sni, Snis
+from .utils import batches, gather
 
 __all__ = ["Kong", "KongError", "KongResponseError"]
 
+T = TypeVar("T")
+
 DEFAULT_USER_AGENT = (
     f"python/{'.'.join(map(str, sys.version_info[:2]))} aio-kong/{__version__}"
 )
 
+# the maximum page size accepted by Kong
+DEFAULT_PAGE_SIZE = 1000
+DEFAULT_BATCH_SIZE = 1000
+
+# sections applied in a single batch at the end of a stream, entities not
+# in them are cleared
+UNBATCHED = frozenset(("plugins",))
+
 KONG_ADMIN_SSL = os.getenv("KONG_ADMIN_SSL", "true").strip().lower() in (
     "true",
     "1",
@@ -42,7 +82,37 @@ def kong_request_kwargs(request_kwargs: dict | None = None) -> dict:
 
 
 class Kong:
-    """Kong client"""
+    """Kong client
+
+    :param concurrency: maximum number of requests in flight at once, when
+        greater than 1 independent entities are applied concurrently. By
+        default requests are not limited and entities are applied one after
+        the other
+    :param page_size: number of entities requested per page when paginating
+    :param prefetch: number of pages requested ahead of the page being
+        consumed when paginating
+    :param cache: optional cache of the entities returned by ``get``
+    :param pool_size: maximum number of open connections
+    :param pool_size_per_host: maximum number of open connections to the same
+        host, 0 for no limit besides ``pool_size``
+    :param keepalive_timeout: seconds idle connections are kept open for reuse
+    :param dns_cache_ttl: seconds resolved addresses are cached, None to cache
+        them forever
+    :param unix_socket: path of a Unix socket the Admin API listens on
+    :param close_session: close the session when closing the client, set it
+        to False when the session is shared with other clients
+    :param retry: optional policy retrying idempotent requests after
+        connection errors and transient failures of the Admin API
+    :param circuit_breaker: optional circuit breaker failing requests fast
+        while the Admin API is down
+    :param metrics: optional sink recording the method, entity type, status,
+        bytes and latency of each request
+    :param codec: JSON codec of request and response bodies, by default the
+        fastest available - orjson or msgspec when installed
+
+    The connection options are used when the client creates its own session,
+    they are ignored when a ``session`` is given.
+    """
 
     def __init__(
         self,
@@ -51,12 +121,44 @@ class Kong:
         request_kwargs: dict | None = None,
         user_agent: str = DEFAULT_USER_AGENT,
         content_type: str = "application/json, text/*; q=0.5",
+        concurrency: int | None = None,
+        page_size: int | None = DEFAULT_PAGE_SIZE,
+        prefetch: int = 1,
+        cache: EntityCache | None = None,
+        pool_size: int = 100,
+        pool_size_per_host: int = 0,
+        keepalive_timeout: float = 15,
+        dns_cache_ttl: int | None = 10,
+        unix_socket: str | None = None,
+        close_session: bool = True,
+        retry: RetryPolicy | None = None,
+        circuit_breaker: CircuitBreaker | None = None,
+        metrics: MetricsSink | None = None,
+        codec: JsonCodec | None = None,
     ) -> None:
         self.url = url or default_admin_url()
         self.session = session
+        self.pool_size = pool_size
+        self.pool_size_per_host = pool_size_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.unix_socket = unix_socket
+        self.close_session = close_session
         self.user_agent = user_agent
         self.content_type = content_type
         self.request_kwargs = kong_request_kwargs(request_kwargs)
+        self.concurrency = max(concurrency or 1, 1)
+        # requests are only queued when a limit is set
+        self.semaphore = asyncio.Semaphore(self.concurrency) if concurrency else None
+        self.page_size = page_size
+        self.prefetch = prefetch
+        self.cache = cache
+        self.retry = retry
+        self.circuit_breaker = circuit_breaker
+        self.metrics = metrics
+        self.codec = codec or default_codec()
+        # when set, writes are recorded in the plan rather than sent
+        self.plan: Plan | None = None
         self.services = Services(self, Service)
         self.routes = Routes(self, Route)
         self.plugins = Plugins(self, Plugin)
@@ -75,9 +177,55 @@ class Kong:
         return self
 
     async def close(self) -> None:
-        if self.session:
+        if self.session and self.close_session:
             await self.session.close()
 
+    def get_session(self) -> ClientSession:
+        """Return the client session, creating it if needed"""
+        if not self.session:
+            self.session = ClientSession(
+                connector=self.connector(),
+                trace_configs=[trace_config()] if self.metrics else None,
+            )
+        return self.session
+
+    def connector(self) -> BaseConnector:
+        """Create the connector pooling the connections of a new session"""
+        if self.unix_socket:
+            return UnixConnector(
+                path=self.unix_socket,
+                limit=self.pool_size,
+                limit_per_host=self.pool_size_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+        return TCPConnector(
+            limit=self.pool_size,
+            limit_per_host=self.pool_size_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=self.dns_cache_ttl,
+        )
+
+    def share(self, url: str, **kwargs: Any) -> Kong:
+        """Create a client for another Admin API URL sharing this client
+        session and its connection pool
+
+        The new client does not close the shared session, ``kwargs``
+        override the options of this client.
+        """
+        options: dict[str, Any] = dict(
+            request_kwargs=self.request_kwargs,
+            user_agent=self.user_agent,
+            content_type=self.content_type,
+            concurrency=self.concurrency if self.semaphore else None,
+            page_size=self.page_size,
+            prefetch=self.prefetch,
+            retry=self.retry,
+            metrics=self.metrics,
+            codec=self.codec,
+        )
+        options.update(kwargs)
+        return Kong(url, session=self.get_session(), close_session=False, **options)
+
     async def __aenter__(self) -> Kong:
         return self
 
@@ -93,45 +241,313 @@ class Kong:
         wrap: Optional[Callable[[Any], Any]] = None,
         **kw: Any,
     ) -> Any:
-        if not self.session:
-            self.session = ClientSession()
+        if self.plan is not None:
+            planned = self.plan.intercept(self.path(url), method, kw)
+            if planned is not None:
+                if callback:
+                    return True
+                return wrap(planned) if wrap else planned
+        session = self.get_session()
         method = method or "GET"
         headers_ = self.default_headers()
         headers_.update(headers or ())
+        if "json" in kw:
+            kw["data"] = self.codec.encode(kw.pop("json"))
+            headers_["content-type"] = "application/json"
         kw.update(self.request_kwargs)
-        response = await self.session.request(method, url, headers=headers_, **kw)
-        if callback:
-            return await callback(response)
-        if response.status == 204:
-            return True
-        if response.status >= 400:
+        attempt = 0
+        while True:
+            attempt += 1
             try:
-                data = await response.json()
-            except Exception:
-                data = await response.text()
-            raise KongResponseError(response, data)
-        response.raise_for_status()
-        data = await response.json()
+                async with self.request_slot(method, url, kw) as trace:
+                    # checked once a slot is acquired so that queued requests
+                    # fail fast when the circuit opens while they wait
+                    if self.circuit_breaker:
+                        self.circuit_breaker.check()
+                    response = await session.request(
+                        method, url, headers=headers_, **kw
+                    )
+                    if trace:
+                        trace.received(response)
+                    if self.circuit_breaker:
+                        self.circuit_breaker.record(response.status)
+                    delay = self.retry_delay(method, attempt, response)
+                    if delay is None:
+                        if callback:
+                            return await callback(response)
+                        if response.status == 204:
+                            return True
+                        if response.status >= 400:
+                            body = await response.read()
+                            try:
+                                data = self.codec.decode(body)
+                            except Exception:
+                                data = body.decode(errors="replace")
+                            if (
+                                response.status == 404
+                                and self.plan is not None
+                                and self.plan.is_upserted_child(self.path(url))
+                            ):
+                                # children of an entity created by the plan
+                                data = {"data": [], "next": None}
+                                break
+                            raise KongResponseError(response, data)
+                        response.raise_for_status()
+                        data = self.codec.decode(await response.read())
+                        break
+                    response.release()
+            except RETRY_ERRORS:
+                if self.circuit_breaker:
+                    self.circuit_breaker.failure()
+                delay = self.retry_delay(method, attempt)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
         return wrap(data) if wrap else data
 
-    async def apply_json(self, config: dict, clear: bool = True) -> dict:
+    @asynccontextmanager
+    async def request_slot(
+        self, method: str, url: str, kw: dict
+    ) -> AsyncIterator[RequestTrace | None]:
+        """Acquire a slot for a request within the client concurrency limit
+
+        When the client has metrics, yield the trace collecting the metrics
+        of the request, recorded once the slot is released
+        """
+        slot = self.semaphore or nullcontext()
+        if self.metrics is None:
+            async with slot:
+                yield None
+            return
+        trace = RequestTrace(method, entity_type(self.path(url)))
+        kw["trace_request_ctx"] = trace
+        async with slot:
+            trace.acquired()
+            try:
+                yield trace
+            finally:
+                self.metrics.record(trace.metric())
+
+    def path(self, url: str) -> str:
+        """Path of a URL relative to the Admin API URL"""
+        return url[len(self.url) :] if url.startswith(self.url) else URL(url).path
+
+    def retry_delay(
+        self, method: str, attempt: int, response: ClientResponse | None = None
+    ) -> float | None:
+        """Seconds to wait before retrying a failed attempt, None not to retry"""
+        if self.retry is None:
+            return None
+        return self.retry.delay(method, attempt, response)
+
+    async def gather(self, aws: Iterable[Awaitable[T]]) -> list[T]:
+        """Await independent operations within the client concurrency limit"""
+        return await gather(aws, self.concurrency)
+
+    async def apply_json(
+        self,
+        config: dict,
+        clear: bool = True,
+        reconcile: bool = False,
+        incremental: bool = False,
+        owner: str | None = None,
+    ) -> dict:
+        """Apply a configuration to Kong
+
+        :param clear: remove plugins and routes not in the configuration
+        :param reconcile: list the current state of each entity type once
+            and write only the entities differing from the configuration
+        :param incremental: skip services and consumers whose configuration
+            entry has not changed since it was last applied, according to the
+            hash stored in their tags, implies ``reconcile``
+        :param owner: tag of the entities owned by the configuration, written
+            entities are tagged with it and only entities with the tag are
+            listed, updated and cleared, implies ``reconcile``
+        """
         if not isinstance(config, dict):
             raise KongError("Expected a dict got %s" % type(config).__name__)
+        context = ApplyContext(
+            self, reconcile=reconcile, incremental=incremental, owner=owner
+        )
         result = {}
         for name, data in config.items():
             if not isinstance(data, list):
                 data = [data]
-            o = getattr(self, name)
-            if not isinstance(o, CrudComponent):
-                raise KongError("Kong object %s not available" % name)
-            result[name] = await o.apply_json(data, clear=clear)
+            o = self.section(name)
+            result[name] = await o.apply_json(data, clear=clear, context=context)
         return result
 
-    async def delete_all(self) -> None:
-        await self.services.delete_all()
-        await self.consumers.delete_all()
-        await self.plugins.delete_all()
-        await self.certificates.delete_all()
+    async def apply_stream(
+        self,
+        entries: Iterable[tuple[str, Any]],
+        clear: bool = True,
+        reconcile: bool = False,
+        incremental: bool = False,
+        owner: str | None = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> dict[str, int]:
+        """Apply configuration entries while they are produced
+
+        ``entries`` yields ``(section, entry)`` pairs, as :func:`.load.load`
+        does while parsing a file. Consecutive entries of a section are
+        applied in batches, as by :meth:`apply_json`, and the next batch is
+        read in a thread while a batch is applied. Only two batches are held
+        in memory at any time and results are not kept.
+
+        Root plugins are collected and applied in a single batch once the
+        other entries are applied, since root plugins not in it are cleared.
+
+        :param batch_size: maximum number of entries of a batch
+        :return: the number of entries applied by section
+        """
+        context = ApplyContext(
+            self, reconcile=reconcile, incremental=incremental, owner=owner
+        )
+        deferred: dict[str, list] = {}
+
+        def streamed() -> Iterator[tuple[str, Any]]:
+            for name, entry in entries:
+                if name in UNBATCHED:
+                    deferred.setdefault(name, []).append(entry)
+                else:
+                    yield name, entry
+
+        result: dict[str, int] = {}
+        read = partial(next, batches(streamed(), batch_size), None)
+        batch = await asyncio.to_thread(read)
+        while batch is not None:
+            following = asyncio.ensure_future(asyncio.to_thread(read))
+            try:
+                name, data = batch
+                o = self.section(name)
+                await o.apply_json(data, clear=clear, context=context)
+            except BaseException:
+                following.cancel()
+                raise
+            result[name] = result.get(name, 0) + len(data)
+            batch = await following
+        for name, data in deferred.items():
+            await self.section(name).apply_json(data, clear=clear, context=context)
+            result[name] = len(data)
+        return result
+
+    def section(self, name: str) -> CrudComponent:
+        """Component applying a section of a configuration"""
+        o = getattr(self, name, None)
+        if not isinstance(o, CrudComponent):
+            raise KongError("Kong object %s not available" % name)
+        return o
+
+    async def apply_nodes(
+        self,
+        config: dict,
+        urls: Iterable[str],
+        clear: bool = True,
+        reconcile: bool = False,
+        incremental: bool = False,
+        owner: str | None = None,
+        declarative: bool | None = False,
+        timeout: float | None = None,
+    ) -> list[NodeResult]:
+        """Apply a configuration to several nodes concurrently
+
+        Each node is applied by a client sharing this client session, see
+        :meth:`share`, and with its own concurrency limit. Failures are
+        reported in the results rather than raised, so that one failing or
+        slow node does not stop the others.
+
+        :param urls: Admin API URLs of the nodes
+        :param declarative: load the configuration via ``POST /config``,
+            when None DB-less nodes are detected and loaded this way
+        :param timeout: seconds after which a node is reported as failed
+        """
+        return list(
+            await asyncio.gather(
+                *(
+                    apply_node(
+                        self.share(url),
+                        config,
+                        clear=clear,
+                        reconcile=reconcile,
+                        incremental=incremental,
+                        owner=owner,
+                        declarative=declarative,
+                        timeout=timeout,
+                    )
+                    for url in dict.fromkeys(urls)
+                )
+            )
+        )
+
+    async def plan_json(
+        self,
+        config: dict,
+        clear: bool = True,
+        reconcile: bool = True,
+        incremental: bool = False,
+        owner: str | None = None,
+    ) -> Plan:
+        """Compute the writes :meth:`apply_json` would send, without sending
+        them
+
+        The current state is read from the Admin API, in reconcile mode via a
+        few listings of all the entities of a type. The plan can be applied
+        later with :meth:`apply_plan` without reading the state again.
+        """
+        plan = Plan(clear=clear, reconcile=reconcile)
+        planner = self.share(self.url)
+        planner.plan = plan
+        await planner.apply_json(
+            config,
+            clear=clear,
+            reconcile=reconcile,
+            incremental=incremental,
+            owner=owner,
+        )
+        return plan
+
+    async def apply_plan(self, plan: Plan) -> list:
+        """Send the writes of a plan in the order they were planned"""
+        result = []
+        for op in plan.operations:
+            result.append(
+                await self.execute(
+                    f"{self.url}{op.path}", op.method, **op.request_kwargs()
+                )
+            )
+        return result
+
+    async def apply_declarative(self, config: dict) -> dict:
+        """Load a configuration in a single request to a DB-less node
+
+        The configuration, in the same format accepted by :meth:`apply_json`,
+        is compiled into a declarative configuration document which replaces
+        the whole configuration of the node via ``POST /config``
+        """
+        document = declarative_config(config)
+        return await self.execute(f"{self.url}/config", "post", json=document)
+
+    async def delete_all(self) -> dict[str, dict]:
+        """Delete all entities
+
+        Return the number of deleted entities and the time taken in seconds
+        for each entity type. Entities deleted by Kong together with their
+        parent - plugins, SNIs, ACLs and credentials - are not counted.
+        """
+        result = {}
+        for component in (
+            self.routes,
+            self.services,
+            self.consumers,
+            self.plugins,
+            self.certificates,
+        ):
+            start = time.perf_counter()
+            deleted = await component.delete_all()
+            result[component.name] = dict(
+                deleted=deleted, seconds=time.perf_counter() - start
+            )
+        return result
 
     def default_headers(self) -> Dict[str, str]:
         return {"user-agent": self.user_agent, "accept": self.content_type}
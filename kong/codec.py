@@ -0,0 +1,83 @@
+"""JSON codecs of request and response bodies
+
+The fastest available codec is used by default: orjson or msgspec when
+installed, the standard library ``json`` module otherwise.
+"""
+
+from __future__ import annotations
+
+import json
+from functools import cache
+from typing import Any, Callable
+
+Default = Callable[[Any], Any] | None
+
+
+class JsonCodec:
+    """JSON codec based on the standard library"""
+
+    name = "json"
+
+    def encode(self, data: Any, default: Default = None, indent: bool = False) -> bytes:
+        """Encode data as UTF-8 JSON
+
+        :param default: function converting objects which cannot be encoded
+        :param indent: indent with two spaces
+        """
+        return json.dumps(
+            data,
+            default=default,
+            indent=2 if indent else None,
+            separators=None if indent else (",", ":"),
+        ).encode()
+
+    def decode(self, data: bytes | str) -> Any:
+        return json.loads(data)
+
+
+class OrjsonCodec(JsonCodec):
+    name = "orjson"
+
+    def __init__(self) -> None:
+        import orjson
+
+        self.orjson = orjson
+
+    def encode(self, data: Any, default: Default = None, indent: bool = False) -> bytes:
+        option = self.orjson.OPT_INDENT_2 if indent else 0
+        return self.orjson.dumps(data, default=default, option=option)
+
+    def decode(self, data: bytes | str) -> Any:
+        return self.orjson.loads(data)
+
+
+class MsgspecCodec(JsonCodec):
+    name = "msgspec"
+
+    def __init__(self) -> None:
+        import msgspec
+
+        self.msgspec = msgspec
+        self.encoder = msgspec.json.Encoder()
+        self.decoder = msgspec.json.Decoder()
+
+    def encode(self, data: Any, default: Default = None, indent: bool = False) -> bytes:
+        if default is None:
+            body = self.encoder.encode(data)
+        else:
+            body = self.msgspec.json.encode(data, enc_hook=default)
+        return self.msgspec.json.format(body, indent=2) if indent else body
+
+    def decode(self, data: bytes | str) -> Any:
+        return self.decoder.decode(data)
+
+
+@cache
+def default_codec() -> JsonCodec:
+    """Return the fastest codec available, codecs are stateless and shared"""
+    for codec in (OrjsonCodec, MsgspecCodec):
+        try:
+            return codec()
+        except ImportError:
+            pass
+    return JsonCodec()
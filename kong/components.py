@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import json
 from typing import (
     TYPE_CHECKING,
@@ -7,12 +8,17 @@ from typing import (
     AsyncIterator,
     Generic,
     Iterator,
+    Literal,
     Mapping,
+    Sequence,
     TypeVar,
+    cast,
+    overload,
 )
 
 from aiohttp import ClientResponse
 
+from .context import ApplyContext
 from .utils import UUID, as_dict, as_params, uid
 
 if TYPE_CHECKING:
@@ -53,9 +59,12 @@ class KongEntity(Mapping[str, Any]):
     - SNI
     """
 
+    __slots__ = ("root", "data", "_children")
+
     def __init__(self, root: Kong | CrudComponent, data: dict[str, Any]) -> None:
         self.root = root
         self.data = data
+        self._children: dict[tuple[type, str], CrudComponent] | None = None
 
     def __repr__(self) -> str:
         return repr(self.data)
@@ -94,14 +103,25 @@ class KongEntity(Mapping[str, Any]):
     def get(self, item: Any, default: Any = None) -> Any:
         return self.data.get(item, default)
 
+    def child(self, component: type[C], factory: type[KongEntity], name: str = "") -> C:
+        """Return a component of the entity children, created on first access"""
+        if self._children is None:
+            self._children = {}
+        key = (component, name)
+        if (child := self._children.get(key)) is None:
+            child = self._children[key] = component(self, factory, name)
+        return cast(C, child)
+
     async def execute(self, url: str, method: str = "", **params: Any) -> Any:
         return await self.root.execute(url, method, **params)
 
 
 Entity = TypeVar("Entity", bound=KongEntity)
+C = TypeVar("C", bound="CrudComponent")
 
 
 class CrudComponent(Generic[Entity]):
+    endpoint_key: str = "name"
 
     def __init__(
         self, root: Kong | KongEntity, factory: type[Entity], name: str = ""
@@ -131,20 +151,121 @@ class CrudComponent(Generic[Entity]):
     async def execute(self, url: str, method: str = "", **kwargs: Any) -> Any:
         return await self.root.execute(url, method, **kwargs)
 
-    async def apply_json(self, data: JsonType, clear: bool = True) -> list:
+    async def apply_json(
+        self,
+        data: JsonType,
+        clear: bool = True,
+        context: ApplyContext | None = None,
+    ) -> list:
         raise NotImplementedError
 
-    async def paginate(self, **params: Any) -> AsyncIterator[Entity]:
+    def apply_context(self, context: ApplyContext | None) -> ApplyContext:
+        return context or ApplyContext(self.cli)
+
+    @overload
+    def paginate(
+        self,
+        page_size: int | None = None,
+        prefetch: int | None = None,
+        *,
+        raw: Literal[False] = False,
+        **params: Any,
+    ) -> AsyncIterator[Entity]: ...
+
+    @overload
+    def paginate(
+        self,
+        page_size: int | None = None,
+        prefetch: int | None = None,
+        *,
+        raw: Literal[True],
+        fields: Sequence[str] | None = None,
+        **params: Any,
+    ) -> AsyncIterator[Any]: ...
+
+    async def paginate(
+        self,
+        page_size: int | None = None,
+        prefetch: int | None = None,
+        *,
+        raw: bool = False,
+        fields: Sequence[str] | None = None,
+        **params: Any,
+    ) -> AsyncIterator[Any]:
+        """Iterate over all entities, see :meth:`pages` for the options
+
+        :param raw: yield the entity data as plain dictionaries rather than
+            entities, or as tuples of the ``fields`` values when given
+        :param fields: names of the fields yielded in raw mode, the rest of
+            the entity data is released as soon as a page is consumed
+        """
+        async for page in self.pages(page_size, prefetch, **params):
+            if fields:
+                for d in page:
+                    yield tuple(d.get(field) for field in fields)
+            elif raw:
+                for d in page:
+                    yield d
+            else:
+                for d in page:
+                    yield self.wrap(d)
+
+    async def pages(
+        self,
+        page_size: int | None = None,
+        prefetch: int | None = None,
+        **params: Any,
+    ) -> AsyncIterator[list[dict]]:
+        """Iterate over pages of raw entity data
+
+        :param page_size: number of entities per page, defaults to the
+            client ``page_size``
+        :param prefetch: number of pages requested ahead of the page being
+            consumed, defaults to the client ``prefetch``. At most
+            ``prefetch`` pages are held in memory besides the current one.
+        """
+        prefetch = self.cli.prefetch if prefetch is None else prefetch
+        pages = self.fetch_pages(page_size, **params)
+        if prefetch < 1:
+            async for page in pages:
+                yield page
+            return
+        queue: asyncio.Queue[list[dict] | Exception | None] = asyncio.Queue(
+            maxsize=prefetch
+        )
+
+        async def read_ahead() -> None:
+            try:
+                async for page in pages:
+                    await queue.put(page)
+                await queue.put(None)
+            except Exception as exc:
+                await queue.put(exc)
+
+        task = asyncio.ensure_future(read_ahead())
+        try:
+            while (item := await queue.get()) is not None:
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            task.cancel()
+
+    async def fetch_pages(
+        self, page_size: int | None = None, **params: Any
+    ) -> AsyncIterator[list[dict]]:
         url = self.list_create_url()
         next_ = url
         exec_params = as_params(**params)
+        page_size = page_size or self.cli.page_size
+        if page_size and "size" not in exec_params:
+            exec_params["size"] = page_size
         while next_:
             if not next_.startswith(url):
                 next_ = f'{url}?{next_.split("?")[1]}'
             data = await self.execute(next_, params=exec_params)
             next_ = data.get("next")
-            for d in data["data"]:
-                yield self.wrap(d)
+            yield data["data"]
 
     async def get_list(self, **params: Any) -> list[Entity]:
         url = self.list_create_url()
@@ -155,30 +276,64 @@ class CrudComponent(Generic[Entity]):
 
     async def get(self, id_: str | UUID) -> Entity:
         url = f"{self.url}/{uid(id_)}"
-        return await self.execute(url, wrap=self.wrap)
+        cache = self.cli.cache
+        if cache is None:
+            return await self.execute(url, wrap=self.wrap)
+        if (entity := cache.get(url)) is None:
+            entity = await self.execute(url, wrap=self.wrap)
+            cache.set(entity, (url, *self.entity_urls(entity)))
+        return cast(Entity, entity)
 
     async def has(self, id_: str | UUID) -> bool:
+        if self.cli.cache is not None:
+            try:
+                await self.get(id_)
+            except KongResponseError as exc:
+                if exc.status == 404:
+                    return False
+                raise
+            return True
         url = f"{self.url}/{uid(id_)}"
         return await self.execute(url, "get", callback=self.head)
 
     async def create(self, **params: Any) -> Entity:
         url = self.list_create_url()
-        return await self.execute(url, "post", json=params, wrap=self.wrap)
+        entity = await self.execute(url, "post", json=params, wrap=self.wrap)
+        self.invalidate(*self.entity_urls(entity))
+        return entity
 
     async def update(self, id_: str | UUID, **params: Any) -> Entity:
         url = f"{self.url}/{uid(id_)}"
-        return await self.execute(url, "patch", json=params, wrap=self.wrap)
+        entity = await self.execute(url, "patch", json=params, wrap=self.wrap)
+        self.invalidate(url, *self.entity_urls(entity))
+        return entity
+
+    async def upsert(self, id_: str | UUID, **params: Any) -> Entity:
+        """Create or replace the entity with the given id or endpoint key in
+        a single request
+
+        Fields not in ``params`` are reset to their default values
+        """
+        url = f"{self.url}/{uid(id_)}"
+        entity = await self.execute(url, "put", json=params, wrap=self.wrap)
+        self.invalidate(url, *self.entity_urls(entity))
+        return entity
 
     async def delete(self, id_: str | UUID) -> bool:
         url = f"{self.url}/{uid(id_)}"
-        return await self.execute(url, "delete")
+        result = await self.execute(url, "delete")
+        self.invalidate(url, cascade=True)
+        return result
 
     async def delete_all(self) -> int:
-        n = 0
-        async for entity in self.paginate():
-            await self.delete(entity.id)
-            n += 1
-        return n
+        """Delete all entities and return the number of deleted entities
+
+        Ids are collected before deleting, deletes run concurrently within
+        the client concurrency limit
+        """
+        ids = [entity.id async for entity in self.paginate()]
+        await self.cli.gather(self.delete(id_) for id_ in ids)
+        return len(ids)
 
     async def head(self, response: ClientResponse) -> bool:
         if response.status == 404:
@@ -188,6 +343,23 @@ class CrudComponent(Generic[Entity]):
         else:  # pragma: no cover
             raise KongResponseError(response)
 
+    def entity_urls(self, entity: Entity) -> list[str]:
+        """URLs addressing an entity"""
+        return [f"{self.url}/{key}" for key in self.index_keys(entity)]
+
+    def invalidate(self, *urls: str, cascade: bool = False) -> None:
+        """Invalidate cached entities, if the client has a cache"""
+        if (cache := self.cli.cache) is not None:
+            for url in urls:
+                cache.invalidate(url, cascade=cascade)
+
+    def index_keys(self, entity: Entity) -> dict[str, Entity]:
+        """Keys addressing an entity - its id and its endpoint key"""
+        keys = {entity.id: entity}
+        if key := entity.get(self.endpoint_key):
+            keys[key] = entity
+        return keys
+
     def wrap(self, data: dict) -> Entity:
         return self.factory(self, data)
 
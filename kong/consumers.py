@@ -1,19 +1,24 @@
-from typing import cast
+from typing import Any, Mapping, Sequence, cast
 
 from .acls import Acl, Acls
-from .auths import ConsumerAuth, auth_factory
-from .components import CrudComponent, JsonType, KongError, KongResponseError
+from .auths import ConsumerAuth, all_credentials, auth_factory
+from .components import CrudComponent, JsonType, KongError
+from .context import ApplyContext
 from .plugins import KongEntityWithPlugins
+from .tags import content_hash, entity_hash, store_hash, with_hash
+from .utils import matches
 
 
 class Consumer(KongEntityWithPlugins):
+    __slots__ = ()
+
     @property
     def username(self) -> str:
         return self.data.get("username", "")
 
     @property
     def acls(self) -> Acls:
-        return Acls(self, Acl)
+        return self.child(Acls, Acl)
 
     @property
     def jwts(self) -> ConsumerAuth:
@@ -29,54 +34,126 @@ class Consumer(KongEntityWithPlugins):
 
 
 class Consumers(CrudComponent[Consumer]):
+    endpoint_key = "username"
+
+    async def apply_credentials(
+        self,
+        auths: list[dict],
+        consumer: Consumer,
+        context: ApplyContext | None = None,
+    ) -> None:
+        """Create or update the credentials of a consumer
 
-    async def apply_credentials(self, auths: list[dict], consumer: Consumer) -> None:
+        Existing credentials are looked up in an index built once per run,
+        see :meth:`.ConsumerAuth.index`
+        """
         for auth_data in auths:
             auth = auth_factory(consumer, auth_data["type"])
-            await auth.create_or_update_credentials(auth_data["config"])
+            await auth.create_or_update_credentials(auth_data["config"], context)
 
-    async def apply_json(self, data: JsonType, clear: bool = True) -> list:
+    async def apply_json(
+        self,
+        data: JsonType,
+        clear: bool = True,
+        context: ApplyContext | None = None,
+    ) -> list:
         if not isinstance(data, list):
             data = [data]
-        result = []
-        for entry in data:
-            if not isinstance(entry, dict):
-                raise KongError("dictionary required")
-            entry = entry.copy()
-            groups = entry.pop("groups", [])
-            auths = entry.pop("auths", [])
-            udata = entry.copy()
-            id_ = udata.pop("id", None)
-            username = None
-            if not id_:
-                username = udata.pop("username", None)
-                if not username:
-                    raise KongError("Consumer username or id is required")
-            uid = cast(str, id_ or username)
-            try:
-                entity = await self.get(uid)
-            except KongResponseError as exc:
-                if exc.status == 404:
-                    entity = await self.create(**entry)
-                else:
-                    raise
-            else:
-                if entry:
-                    entity = await self.update(uid, **udata)
-            consumer = cast(Consumer, entity)
-            acls = await consumer.acls.get_list()
-            current_groups = dict(((a["group"], a) for a in acls))
-            for group in groups:
-                if group not in current_groups:
-                    await consumer.acls.create(group=group)
-                else:
-                    current_groups.pop(group)
+        context = self.apply_context(context)
+        current = None
+        if context.incremental:
+            # ACLs and credentials are listed only if a consumer has changed
+            current = await context.current(self)
+        elif context.reconcile:
+            # list consumers, ACLs and credentials of all consumers upfront
+            auth_types = {
+                auth["type"]
+                for entry in data
+                if isinstance(entry, dict)
+                for auth in entry.get("auths", ())
+            }
+            components: list[CrudComponent] = [self.cli.acls]
+            components.extend(all_credentials(self.cli, t) for t in sorted(auth_types))
+            current = await context.current(self)
+            await self.cli.gather(
+                context.children(component, "consumer") for component in components
+            )
+        return await self.cli.gather(
+            self.apply_entry(entry, context, current) for entry in data
+        )
 
-            for acl in current_groups.values():
-                await consumer.acls.delete(acl["id"])
+    async def apply_entry(
+        self,
+        entry: dict,
+        context: ApplyContext,
+        current: dict[str, Consumer] | None = None,
+    ) -> dict:
+        """Apply a consumer entry together with its groups, credentials and,
+        when the entry lists them, its plugins
 
-            await self.apply_credentials(auths, consumer)
-
-            result.append(consumer.data)
-
-        return result
+        The consumer is upserted. When the ``current`` consumers are given,
+        existence is checked against them and the consumer is written only
+        if it differs. In
+        incremental mode a consumer with the hash of the entry is skipped.
+        """
+        if not isinstance(entry, dict):
+            raise KongError("dictionary required")
+        digest = content_hash(entry) if context.incremental else None
+        entry = entry.copy()
+        groups = entry.pop("groups", [])
+        auths = entry.pop("auths", [])
+        # plugins of a consumer are managed only when listed in the entry
+        plugins = entry.pop("plugins", None)
+        context.owned(entry)
+        udata = entry.copy()
+        id_ = udata.pop("id", None)
+        username = None
+        if not id_:
+            username = udata.pop("username", None)
+            if not username:
+                raise KongError("Consumer username or id is required")
+        uid = cast(str, id_ or username)
+        if current is not None:
+            existing = current.get(uid)
+            if digest and existing and entity_hash(existing.data) == digest:
+                return existing.data
+            if digest and "tags" in entry:
+                # the previous hash is replaced once the children are applied
+                previous = entity_hash(existing.data) if existing else None
+                entry["tags"] = udata["tags"] = with_hash(entry["tags"], previous)
+            if existing is None:
+                entity = await self.create(**entry)
+            elif udata and not matches(udata, existing.data):
+                entity = await self.upsert(uid, **udata)
+            else:
+                entity = existing
+        else:
+            entity = await self.upsert(uid, **udata)
+        consumer = cast(Consumer, context.store(self, entity))
+        acls: Sequence[Mapping[str, Any]]
+        if context.reconcile:
+            acls_index = await context.children(self.cli.acls, "consumer")
+            acls = acls_index.get(consumer.id, [])
+        else:
+            acls = await consumer.acls.get_full_list(**context.scope)
+        current_groups = dict(((a["group"], a) for a in acls))
+        created = await self.cli.gather(
+            consumer.acls.create(**context.owned(dict(group=group)))
+            for group in groups
+            if current_groups.pop(group, None) is None
+        )
+        await self.cli.gather(
+            consumer.acls.delete(acl["id"]) for acl in current_groups.values()
+        )
+        if context.reconcile:
+            acls_index[consumer.id] = [
+                dict(acl) for acl in acls if acl["group"] in groups
+            ] + [acl.data for acl in created]
+        await self.apply_credentials(auths, consumer, context)
+        if plugins is not None:
+            consumer.data["plugins"] = await consumer.plugins.apply_json(
+                plugins, context=context
+            )
+        if digest:
+            await store_hash(self, consumer, digest)
+        return consumer.data
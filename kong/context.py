@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Hashable, TypeVar, cast
+
+from .utils import is_uuid
+
+if TYPE_CHECKING:
+    from .client import Kong
+    from .components import CrudComponent, KongEntity
+
+E = TypeVar("E", bound="KongEntity")
+T = TypeVar("T")
+
+# foreign key fields and the client components of the referenced entities
+FOREIGN_KEYS = {
+    "service": "services",
+    "route": "routes",
+    "consumer": "consumers",
+    "certificate": "certificates",
+}
+
+# parent foreign key fields by the name of the parent component
+PARENTS = {name: field for field, name in FOREIGN_KEYS.items()}
+
+
+class ApplyContext:
+    """State shared by the components during a single apply run
+
+    :param reconcile: when True the current state of each entity type is
+        listed once and only entities differing from the configuration are
+        written
+    :param incremental: when True services and consumers whose entry has the
+        hash stored in their tags are skipped together with their children,
+        implies ``reconcile``
+    :param owner: tag of the entities owned by the configuration, written
+        entities are tagged with it and the current state is listed filtering
+        by it, implies ``reconcile``
+    """
+
+    def __init__(
+        self,
+        cli: Kong,
+        reconcile: bool = False,
+        incremental: bool = False,
+        owner: str | None = None,
+    ) -> None:
+        self.cli = cli
+        self.reconcile = reconcile or incremental or bool(owner)
+        self.incremental = incremental
+        self.owner = owner
+        self._current: dict[str, asyncio.Future[dict[str, Any]]] = {}
+        self._listings: dict[str, asyncio.Future[list[dict]]] = {}
+        self._children: dict[tuple[str, str], asyncio.Future[dict[str, list[dict]]]] = (
+            {}
+        )
+        self._memo: dict[Hashable, asyncio.Future[Any]] = {}
+
+    async def current(self, component: CrudComponent[E]) -> dict[str, E]:
+        """Current entities of a component indexed by id and endpoint key
+
+        The full listing is requested once per run, concurrent callers share
+        the same request.
+        """
+        url = component.list_create_url()
+        if url not in self._current:
+            self._current[url] = asyncio.ensure_future(self._index(component))
+        return await self._current[url]
+
+    async def children(
+        self, component: CrudComponent, parent: str
+    ) -> dict[str, list[dict]]:
+        """Raw data of all the entities of a component grouped by the id of
+        their ``parent`` entity
+
+        The full listing is requested once per run, concurrent callers share
+        the same request, and entities with several parents, such as plugins,
+        are grouped by each of them from the same listing.
+        """
+        key = (component.list_create_url(), parent)
+        if key not in self._children:
+            self._children[key] = asyncio.ensure_future(self._group(component, parent))
+        return await self._children[key]
+
+    async def listing(self, component: CrudComponent) -> list[dict]:
+        """Raw data of all the entities of a component, listed once per run"""
+        url = component.list_create_url()
+        if url not in self._listings:
+            self._listings[url] = asyncio.ensure_future(self._list(component))
+        return await self._listings[url]
+
+    @property
+    def bulk_children(self) -> bool:
+        """Children of all entities are listed at once, see :meth:`child_entities`
+
+        In incremental mode only the children of changed entities are
+        needed and they are listed per entity
+        """
+        return self.reconcile and not self.incremental
+
+    async def child_entities(self, component: CrudComponent[E]) -> list[E]:
+        """Current entities of a component of an entity, such as the routes
+        of a service, from the listing of all the entities of their type
+
+        The children of each parent are meant to be read once per run, the
+        grouped listing is not updated by writes.
+        """
+        parent = cast("KongEntity", component.root)
+        field = PARENTS[cast("CrudComponent", parent.root).name]
+        groups = await self.children(getattr(self.cli, component.name), field)
+        return [component.wrap(data) for data in groups.get(parent.id, ())]
+
+    async def memo(self, key: Hashable, create: Callable[[], Awaitable[T]]) -> T:
+        """Await ``create`` once per run for each key
+
+        Concurrent callers share the same result, or the same error.
+        """
+        if key not in self._memo:
+            self._memo[key] = asyncio.ensure_future(create())
+        return await self._memo[key]
+
+    async def resolve(self, component: CrudComponent, ref: str) -> str:
+        """Id of an entity referenced by id or endpoint key
+
+        Lookups are memoized for the run, so an entity referenced by many
+        plugins is requested once.
+        """
+        return await self.memo(
+            ("id", component.list_create_url(), ref),
+            lambda: self._resolve(component, ref),
+        )
+
+    async def foreign_keys(self, params: dict, *fields: str) -> dict:
+        """Replace foreign keys given by endpoint key with the entity ids
+
+        :param fields: foreign key fields, one of ``service``, ``route``,
+            ``consumer`` and ``certificate``
+        """
+        for field in fields:
+            ref = params.get(field)
+            if not isinstance(ref, dict):
+                continue
+            component = getattr(self.cli, FOREIGN_KEYS[field])
+            key = ref.get("id") or ref.get(component.endpoint_key)
+            if key and not is_uuid(key):
+                params[field] = {"id": await self.resolve(component, key)}
+        return params
+
+    @property
+    def scope(self) -> dict[str, Any]:
+        """Query parameters of the listings of the current state"""
+        return {"tags": self.owner} if self.owner else {}
+
+    def owned(self, params: dict) -> dict:
+        """Add the ownership tag to the parameters of an entity"""
+        if self.owner:
+            tags = list(params.get("tags") or ())
+            if self.owner not in tags:
+                tags.append(self.owner)
+            params["tags"] = tags
+        return params
+
+    def store(self, component: CrudComponent[E], entity: E) -> E:
+        """Record a written entity in the current state of its component"""
+        index = self._current.get(component.list_create_url())
+        if index and index.done() and not index.exception():
+            index.result().update(component.index_keys(entity))
+        return entity
+
+    def discard(self, component: CrudComponent, entity: KongEntity) -> None:
+        """Remove a deleted entity from the current state of its component"""
+        index = self._current.get(component.list_create_url())
+        if index and index.done() and not index.exception():
+            for key in component.index_keys(entity):
+                index.result().pop(key, None)
+
+    async def _resolve(self, component: CrudComponent, ref: str) -> str:
+        entity = await component.get(ref)
+        return entity.id
+
+    async def _group(
+        self, component: CrudComponent, parent: str
+    ) -> dict[str, list[dict]]:
+        groups: dict[str, list[dict]] = {}
+        for data in await self.listing(component):
+            if ref := data.get(parent):
+                groups.setdefault(ref["id"], []).append(data)
+        return groups
+
+    async def _list(self, component: CrudComponent) -> list[dict]:
+        return [data async for data in component.paginate(raw=True, **self.scope)]
+
+    async def _index(self, component: CrudComponent) -> dict[str, Any]:
+        index: dict[str, Any] = {}
+        async for entity in component.paginate(**self.scope):
+            index.update(component.index_keys(entity))
+        return index
@@ -0,0 +1,145 @@
+"""Compile configurations into Kong declarative configuration documents
+
+DB-less Kong nodes load their whole configuration from a single declarative
+document posted to the ``/config`` endpoint. The functions in this module
+translate the configuration schema accepted by :meth:`.Kong.apply_json`
+into such a document. References which are looked up via the Admin API
+when applying entity by entity - consumers referenced by plugins and local
+upstream hosts - are resolved on the client side.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+from uuid import UUID, uuid5
+
+from .components import KongError
+from .services import LOCAL_HOST, REMOVE
+from .utils import as_list, local_ip
+
+FORMAT_VERSION = "3.0"
+
+# namespace of the deterministic ids given to consumers without one
+NAMESPACE = UUID("1b0c8a2e-5cbf-4a4b-9d7c-3f4e8f6a9d21")
+
+CREDENTIALS = {
+    "basic-auth": "basicauth_credentials",
+    "hmac-auth": "hmacauth_credentials",
+    "jwt": "jwt_secrets",
+    "key-auth": "keyauth_credentials",
+    "oauth2": "oauth2_credentials",
+}
+
+SECTIONS = ("services", "consumers", "plugins", "certificates", "snis", "acls")
+
+
+def declarative_config(config: dict) -> dict:
+    """Compile a configuration into a declarative configuration document"""
+    if not isinstance(config, dict):
+        raise KongError("Expected a dict got %s" % type(config).__name__)
+    for name in config:
+        if name not in SECTIONS:
+            raise KongError("Kong object %s not available" % name)
+    sections = {name: as_entries(data) for name, data in config.items()}
+    consumers = [consumer_entry(entry) for entry in sections.get("consumers", ())]
+    resolver = ConsumerResolver(consumers)
+    document: dict[str, Any] = {"_format_version": FORMAT_VERSION}
+    services = [
+        service_entry(entry, resolver) for entry in sections.get("services", ())
+    ]
+    document["services"] = [s for s in services if s is not None]
+    document["consumers"] = consumers
+    document["plugins"] = [
+        plugin_entry(entry, resolver) for entry in sections.get("plugins", ())
+    ]
+    for name in ("certificates", "snis", "acls"):
+        document[name] = [dict(entry) for entry in sections.get(name, ())]
+    return {k: v for k, v in document.items() if v or k == "_format_version"}
+
+
+class ConsumerResolver:
+    """Resolve consumer references to the ids of the declared consumers"""
+
+    def __init__(self, consumers: list[dict]) -> None:
+        self.ids: dict[str, str] = {}
+        for consumer in consumers:
+            for key in ("id", "username", "custom_id"):
+                if consumer.get(key):
+                    self.ids[consumer[key]] = consumer["id"]
+
+    def resolve(self, ref: str) -> str:
+        if ref in self.ids:
+            return self.ids[ref]
+        try:
+            return str(UUID(ref))
+        except ValueError:
+            raise KongError("Consumer '%s' is not in the configuration" % ref) from None
+
+
+def as_entries(data: Any) -> list[dict]:
+    entries = data if isinstance(data, list) else [data]
+    for entry in entries:
+        if not isinstance(entry, dict):
+            raise KongError("dictionary required")
+    return entries
+
+
+def service_entry(entry: dict, resolver: ConsumerResolver) -> dict | None:
+    entry = entry.copy()
+    if entry.pop("ensure", None) in REMOVE:
+        return None
+    if entry.get("host") in LOCAL_HOST:
+        entry["host"] = local_ip()
+    entry["routes"] = [
+        route_entry(route, resolver) for route in as_entries(entry.pop("routes", []))
+    ]
+    entry["plugins"] = [
+        plugin_entry(plugin, resolver)
+        for plugin in as_entries(entry.pop("plugins", []))
+    ]
+    return entry
+
+
+def route_entry(entry: dict, resolver: ConsumerResolver) -> dict:
+    entry = entry.copy()
+    as_list("hosts", entry)
+    as_list("paths", entry)
+    as_list("methods", entry)
+    entry["plugins"] = [
+        plugin_entry(plugin, resolver)
+        for plugin in as_entries(entry.pop("plugins", []))
+    ]
+    return entry
+
+
+def plugin_entry(entry: dict, resolver: ConsumerResolver) -> dict:
+    entry = entry.copy()
+    if not entry.get("name"):
+        raise KongError("Plugin name not specified")
+    config = entry.get("config")
+    if isinstance(config, dict) and config.get("anonymous"):
+        entry["config"] = dict(config, anonymous=resolver.resolve(config["anonymous"]))
+    consumer = entry.get("consumer")
+    if isinstance(consumer, dict):
+        ref = consumer.get("id") or consumer.get("username")
+        if ref:
+            entry["consumer"] = resolver.resolve(ref)
+    return entry
+
+
+def consumer_entry(entry: dict) -> dict:
+    entry = entry.copy()
+    groups = entry.pop("groups", [])
+    auths = entry.pop("auths", [])
+    username = entry.get("username")
+    if not entry.get("id"):
+        if not username:
+            raise KongError("Consumer username or id is required")
+        entry["id"] = str(uuid5(NAMESPACE, username))
+    if groups:
+        entry["acls"] = [{"group": group} for group in groups]
+    for auth in auths:
+        if (key := CREDENTIALS.get(auth["type"])) is None:
+            raise KongError("Unknown authentication type %s" % auth["type"])
+        entry.setdefault(key, []).append(dict(auth["config"]))
+    return entry
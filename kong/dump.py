@@ -0,0 +1,192 @@
+"""Stream the current state of Kong in the configuration schema
+
+The entries yielded by :func:`dump` can be applied with
+:meth:`.Kong.apply_json`. All sections are listed concurrently, each
+through :meth:`.CrudComponent.paginate`, and at most ``window`` entries
+of a section are held in memory at any time, regardless of the number of
+entities. basic-auth passwords are stored hashed and are not dumped.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING, Any, AsyncIterator, Awaitable, Callable
+
+from .auths import auth_factory
+from .tags import with_hash
+
+if TYPE_CHECKING:
+    from .client import Kong
+    from .components import CrudComponent, KongEntity
+    from .consumers import Consumer
+    from .routes import Route
+    from .services import Service
+
+# consumers come first, since plugins of services and routes reference them
+SECTIONS = ("consumers", "services", "plugins", "snis")
+
+# credentials dumped with consumers
+CREDENTIALS = ("basic-auth", "jwt", "key-auth")
+
+# credential fields stored in a form which cannot be applied again
+UNRESTORABLE = frozenset((("basic-auth", "password"),))
+
+# fields set by Kong rather than by a configuration
+GENERATED = frozenset(("created_at", "updated_at"))
+
+# references to parent entities, implied by the nesting of the entries
+PARENTS = frozenset(("service", "route", "consumer"))
+
+
+async def dump(
+    cli: Kong, sections: tuple[str, ...] = SECTIONS, window: int | None = None
+) -> AsyncIterator[tuple[str, dict]]:
+    """Yield ``(section, entry)`` pairs of the current state of Kong
+
+    :param window: number of entries of a section built concurrently, the
+        children of each entity are listed while building its entry.
+        Defaults to the client concurrency.
+    """
+    window = window or cli.concurrency
+    queues: list[asyncio.Queue] = []
+    tasks: list[asyncio.Task] = []
+    for name in sections:
+        if name not in SECTIONS:
+            raise ValueError("Cannot dump %s" % name)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=window)
+        queues.append(queue)
+        tasks.append(asyncio.ensure_future(produce(cli, name, queue)))
+    try:
+        for name, queue in zip(sections, queues, strict=True):
+            while (item := await queue.get()) is not None:
+                if isinstance(item, Exception):
+                    raise item
+                yield name, await item
+    finally:
+        for task in tasks:
+            task.cancel()
+        for queue in queues:
+            while not queue.empty():
+                if isinstance(item := queue.get_nowait(), asyncio.Future):
+                    item.cancel()
+
+
+async def produce(cli: Kong, name: str, queue: asyncio.Queue) -> None:
+    """Put the futures of the entries of a section in the queue, in order"""
+    component: CrudComponent = getattr(cli, name)
+    build: Callable[[Any], Awaitable[dict]] = ENTRIES[name]
+    try:
+        async for entity in component.paginate():
+            if name == "plugins" and not cli.plugins.root_plugin(entity):
+                continue
+            await queue.put(asyncio.ensure_future(build(entity)))
+        await queue.put(None)
+    except Exception as exc:
+        await queue.put(exc)
+
+
+async def service_entry(service: Service) -> dict:
+    routes, plugins = await asyncio.gather(
+        children(service.routes, route_entry), children(service.plugins, plugin_entry)
+    )
+    return dict(entry(service), routes=routes, plugins=plugins)
+
+
+async def route_entry(route: Route) -> dict:
+    return dict(entry(route), plugins=await children(route.plugins, plugin_entry))
+
+
+async def consumer_entry(consumer: Consumer) -> dict:
+    acls, plugins, *credentials = await asyncio.gather(
+        children(consumer.acls),
+        consumer_plugins(consumer),
+        *(children(auth_factory(consumer, name)) for name in CREDENTIALS),
+    )
+    data = entry(consumer)
+    if groups := sorted(acl["group"] for acl in acls):
+        data["groups"] = groups
+    auths = [
+        dict(type=name, config=credential_config(name, config))
+        for name, configs in zip(CREDENTIALS, credentials, strict=True)
+        for config in configs
+    ]
+    if auths:
+        data["auths"] = auths
+    if plugins:
+        data["plugins"] = plugins
+    return data
+
+
+async def consumer_plugins(consumer: Consumer) -> list[dict]:
+    """Plugins applying to a consumer only, plugins of a service or a route
+    and a consumer are dumped with the service or the route"""
+    return [
+        entry(plugin)
+        async for plugin in consumer.plugins.paginate()
+        if not (plugin.get("service") or plugin.get("route"))
+    ]
+
+
+async def plugin_entry(plugin: KongEntity) -> dict:
+    """Entry of a plugin, with the consumer it applies to by username"""
+    data = entry(plugin)
+    if consumer := plugin.get("consumer"):
+        ref = await plugin.cli.consumers.get(consumer["id"])
+        data["consumer"] = (
+            {"username": ref["username"]} if ref.get("username") else {"id": ref.id}
+        )
+    return data
+
+
+def credential_config(name: str, config: dict) -> dict:
+    """Configuration of a credential, without the fields which cannot be
+    applied again
+
+    basic-auth passwords are stored hashed and are left out, they must be
+    added to the configuration before applying it
+    """
+    return {
+        key: value
+        for key, value in config.items()
+        if key != "id" and (name, key) not in UNRESTORABLE
+    }
+
+
+async def sni_entry(sni: KongEntity) -> dict:
+    return entry(sni)
+
+
+async def children(
+    component: CrudComponent,
+    build: Callable[[Any], Awaitable[dict]] | None = None,
+) -> list[dict]:
+    if build is None:
+        return [entry(child) async for child in component.paginate()]
+    return [await build(child) async for child in component.paginate()]
+
+
+def entry(entity: KongEntity) -> dict:
+    """Configuration entry of an entity
+
+    Fields set by Kong, empty fields, references to the parent entity and
+    hash tags are dropped, ids are kept only for entities without a name
+    """
+    data = {
+        key: value
+        for key, value in entity.data.items()
+        if value is not None and key not in GENERATED and key not in PARENTS
+    }
+    if "tags" in data:
+        if tags := with_hash(data.pop("tags"), None):
+            data["tags"] = tags
+    if data.get("name") or data.get("username") or data.get("group"):
+        data.pop("id", None)
+    return data
+
+
+ENTRIES: dict[str, Callable[[Any], Awaitable[dict]]] = {
+    "services": service_entry,
+    "consumers": consumer_entry,
+    "plugins": plugin_entry,
+    "snis": sni_entry,
+}
@@ -0,0 +1,828 @@
+"""In-memory fake of the Kong Admin API
+
+The fake implements the subset of the Admin API used by this client -
+CRUD and upserts on services, routes, plugins, consumers, ACLs,
+credentials, certificates and SNIs, nested endpoints, cursor pagination,
+tag filtering, cascading deletes and the DB-less ``/config`` endpoint.
+
+It runs inside the event loop of the caller and can inject latency and
+failures, which makes it suitable for testing and benchmarking the client
+without a real Kong and Postgres:
+
+```python
+async with FakeKong(latency=0.02) as fake:
+    async with Kong(url=fake.url) as cli:
+        await cli.apply_json(config)
+```
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import bisect
+import hashlib
+import json
+import random
+import secrets
+import time
+from collections import Counter, defaultdict
+from typing import Any, Awaitable, Callable, Iterable
+from urllib.parse import urlparse
+from uuid import UUID, uuid4
+
+from aiohttp import web
+
+from .utils import is_uuid
+
+Handler = Callable[[web.Request], Awaitable[web.StreamResponse]]
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class Schema:
+    """Schema of a Kong entity type as seen by the fake"""
+
+    def __init__(
+        self,
+        name: str,
+        endpoint_key: str = "",
+        defaults: dict[str, Any] | None = None,
+        foreign: dict[str, tuple[str, str]] | None = None,
+        unique: tuple[tuple[str, ...], ...] = (),
+        required: tuple[str, ...] = (),
+        path: str = "",
+        nested_path: str = "",
+    ) -> None:
+        self.name = name
+        self.endpoint_key = endpoint_key
+        self.defaults = defaults or {}
+        self.foreign = foreign or {}
+        self.unique = unique
+        self.required = required
+        self.path = path or name
+        self.nested_path = nested_path or self.path
+
+
+def _credential(name: str, path: str, nested_path: str, key: str) -> Schema:
+    return Schema(
+        name,
+        endpoint_key=key,
+        defaults={"tags": None},
+        foreign={"consumer": ("consumers", "cascade")},
+        path=path,
+        nested_path=nested_path,
+    )
+
+
+SCHEMAS: dict[str, Schema] = {
+    s.name: s
+    for s in (
+        Schema(
+            "services",
+            endpoint_key="name",
+            defaults={
+                "name": None,
+                "protocol": "http",
+                "port": 80,
+                "path": None,
+                "retries": 5,
+                "connect_timeout": 60000,
+                "write_timeout": 60000,
+                "read_timeout": 60000,
+                "enabled": True,
+                "tags": None,
+                "client_certificate": None,
+                "tls_verify": None,
+                "tls_verify_depth": None,
+                "ca_certificates": None,
+            },
+            foreign={"client_certificate": ("certificates", "restrict")},
+            required=("host",),
+        ),
+        Schema(
+            "routes",
+            endpoint_key="name",
+            defaults={
+                "name": None,
+                "protocols": ["http", "https"],
+                "methods": None,
+                "hosts": None,
+                "paths": None,
+                "headers": None,
+                "snis": None,
+                "sources": None,
+                "destinations": None,
+                "https_redirect_status_code": 426,
+                "regex_priority": 0,
+                "strip_path": True,
+                "path_handling": "v0",
+                "preserve_host": False,
+                "request_buffering": True,
+                "response_buffering": True,
+                "tags": None,
+                "service": None,
+            },
+            foreign={"service": ("services", "restrict")},
+        ),
+        Schema(
+            "plugins",
+            defaults={
+                "config": {},
+                "enabled": True,
+                "protocols": ["grpc", "grpcs", "http", "https"],
+                "service": None,
+                "route": None,
+                "consumer": None,
+                "instance_name": None,
+                "tags": None,
+            },
+            foreign={
+                "service": ("services", "cascade"),
+                "route": ("routes", "cascade"),
+                "consumer": ("consumers", "cascade"),
+            },
+            unique=(("name", "service", "route", "consumer"),),
+            required=("name",),
+        ),
+        Schema(
+            "consumers",
+            endpoint_key="username",
+            defaults={"username": None, "custom_id": None, "tags": None},
+            unique=(("custom_id",),),
+        ),
+        Schema(
+            "certificates",
+            defaults={"cert_alt": None, "key_alt": None, "tags": None},
+            required=("cert", "key"),
+        ),
+        Schema(
+            "snis",
+            endpoint_key="name",
+            defaults={"tags": None},
+            foreign={"certificate": ("certificates", "cascade")},
+            required=("name", "certificate"),
+        ),
+        Schema(
+            "acls",
+            defaults={"tags": None},
+            foreign={"consumer": ("consumers", "cascade")},
+            unique=(("consumer", "group"),),
+            required=("group",),
+        ),
+        _credential("keyauth_credentials", "key-auths", "key-auth", "key"),
+        _credential("basicauth_credentials", "basic-auths", "basic-auth", "username"),
+        _credential("jwt_secrets", "jwts", "jwt", "key"),
+    )
+}
+
+PATHS = {s.path: s for s in SCHEMAS.values()}
+NESTED_PATHS = {s.nested_path: s for s in SCHEMAS.values()}
+
+
+class FakeError(Exception):
+    def __init__(self, status: int, message: str, **extra: Any) -> None:
+        self.status = status
+        self.body = {"message": message, **extra}
+
+
+def not_found() -> FakeError:
+    return FakeError(404, "Not found")
+
+
+class Store:
+    """Entities of all types, ordered by id as Kong pages them"""
+
+    def __init__(self) -> None:
+        self.entities: dict[str, dict[str, dict]] = {n: {} for n in SCHEMAS}
+        self.ordered: dict[str, list[str]] = {n: [] for n in SCHEMAS}
+        self.keys: dict[str, dict[Any, str]] = {n: {} for n in SCHEMAS}
+        self.children: dict[tuple[str, str], dict[str, set[str]]] = defaultdict(
+            lambda: defaultdict(set)
+        )
+
+    def count(self) -> dict[str, int]:
+        return {n: len(e) for n, e in self.entities.items() if e}
+
+    # lookup
+
+    def find(self, schema: Schema, key: str) -> dict | None:
+        entities = self.entities[schema.name]
+        if is_uuid(key) and (entity := entities.get(str(UUID(key)))):
+            return entity
+        if schema.endpoint_key:
+            if id_ := self.keys[schema.name].get(key):
+                return entities[id_]
+        return None
+
+    def get(self, schema: Schema, key: str) -> dict:
+        if (entity := self.find(schema, key)) is None:
+            raise not_found()
+        return entity
+
+    def children_ids(self, schema: Schema, field: str, parent_id: str) -> list[str]:
+        return sorted(self.children[(schema.name, field)].get(parent_id, ()))
+
+    # pagination
+
+    def page(
+        self,
+        schema: Schema,
+        offset: str | None,
+        size: int,
+        ids: list[str] | None = None,
+        tags: str | None = None,
+    ) -> tuple[list[dict], str | None]:
+        ids = self.ordered[schema.name] if ids is None else ids
+        start = bisect.bisect_right(ids, offset) if offset else 0
+        match = tags_filter(tags)
+        entities = self.entities[schema.name]
+        data: list[dict] = []
+        for index in range(start, len(ids)):
+            entity = entities[ids[index]]
+            if match(entity):
+                if len(data) == size:
+                    return data, data[-1]["id"]
+                data.append(entity)
+        return data, None
+
+    # write
+
+    def insert(self, schema: Schema, entity: dict) -> dict:
+        self.check_unique(schema, entity)
+        id_ = entity["id"]
+        self.entities[schema.name][id_] = entity
+        bisect.insort(self.ordered[schema.name], id_)
+        self.index(schema, entity)
+        return entity
+
+    def extend(self, schema: Schema, entities: list[dict]) -> None:
+        """Insert many entities, sorting the page order once"""
+        for entity in entities:
+            self.check_unique(schema, entity)
+            self.entities[schema.name][entity["id"]] = entity
+            self.index(schema, entity)
+        self.ordered[schema.name] = sorted(self.entities[schema.name])
+
+    def replace(self, schema: Schema, entity: dict) -> dict:
+        previous = self.entities[schema.name][entity["id"]]
+        self.unindex(schema, previous)
+        try:
+            self.check_unique(schema, entity)
+        except FakeError:
+            self.index(schema, previous)
+            raise
+        self.entities[schema.name][entity["id"]] = entity
+        self.index(schema, entity)
+        return entity
+
+    def remove(self, schema: Schema, entity: dict) -> None:
+        for child, field in self.references(schema):
+            child_ids = self.children_ids(child, field, entity["id"])
+            if not child_ids:
+                continue
+            if child.foreign[field][1] != "cascade":
+                raise FakeError(
+                    400,
+                    f"an existing '{child.name}' entity references "
+                    f"this '{schema.name}' entity",
+                    name="foreign key violation",
+                    code=4,
+                )
+        for child, field in self.references(schema):
+            for child_id in self.children_ids(child, field, entity["id"]):
+                if child_entity := self.entities[child.name].get(child_id):
+                    self.remove(child, child_entity)
+        self.unindex(schema, entity)
+        self.entities[schema.name].pop(entity["id"])
+        ordered = self.ordered[schema.name]
+        del ordered[bisect.bisect_left(ordered, entity["id"])]
+
+    def references(self, schema: Schema) -> list[tuple[Schema, str]]:
+        return [
+            (child, field)
+            for child in SCHEMAS.values()
+            for field, (parent, _) in child.foreign.items()
+            if parent == schema.name
+        ]
+
+    def check_unique(self, schema: Schema, entity: dict) -> None:
+        if schema.endpoint_key:
+            value = entity.get(schema.endpoint_key)
+            existing = self.keys[schema.name].get(value)
+            if value is not None and existing and existing != entity["id"]:
+                raise unique_violation(schema.endpoint_key, value)
+        for fields in schema.unique:
+            if all(entity.get(f) is None for f in fields):
+                continue
+            signature = [entity.get(f) for f in fields]
+            for other in self.candidates(schema, entity, fields):
+                if other["id"] != entity["id"] and signature == [
+                    other.get(f) for f in fields
+                ]:
+                    raise unique_violation(fields[0], entity.get(fields[0]))
+
+    def candidates(self, schema: Schema, entity: dict, fields: tuple) -> list[dict]:
+        entities = self.entities[schema.name]
+        for field in fields:
+            if field in schema.foreign and entity.get(field):
+                ids = self.children_ids(schema, field, entity[field]["id"])
+                return [entities[i] for i in ids]
+        return list(entities.values())
+
+    def index(self, schema: Schema, entity: dict) -> None:
+        if schema.endpoint_key and entity.get(schema.endpoint_key) is not None:
+            self.keys[schema.name][entity[schema.endpoint_key]] = entity["id"]
+        for field in schema.foreign:
+            if ref := entity.get(field):
+                self.children[(schema.name, field)][ref["id"]].add(entity["id"])
+
+    def unindex(self, schema: Schema, entity: dict) -> None:
+        if schema.endpoint_key and entity.get(schema.endpoint_key) is not None:
+            self.keys[schema.name].pop(entity[schema.endpoint_key], None)
+        for field in schema.foreign:
+            if ref := entity.get(field):
+                self.children[(schema.name, field)][ref["id"]].discard(entity["id"])
+
+
+def unique_violation(field: str, value: Any) -> FakeError:
+    return FakeError(
+        409,
+        f"UNIQUE violation detected on '{{{field}={json.dumps(value)}}}'",
+        name="unique constraint violation",
+        code=5,
+    )
+
+
+def tags_filter(tags: str | None) -> Callable[[dict], bool]:
+    if not tags:
+        return lambda entity: True
+    if "/" in tags:
+        any_of = set(tags.split("/"))
+        return lambda entity: bool(any_of.intersection(entity.get("tags") or ()))
+    all_of = set(tags.split(","))
+    return lambda entity: all_of.issubset(entity.get("tags") or ())
+
+
+class FakeKong:
+    """In-memory Kong Admin API served by an aiohttp application
+
+    :param latency: seconds added to every request
+    :param error_rate: probability of answering a request with a 503
+    :param seed: seed of the random generator used for error injection
+    :param database: database reported by the node information, "off" for
+        a DB-less node
+    """
+
+    def __init__(
+        self,
+        latency: float = 0,
+        error_rate: float = 0,
+        seed: int | None = None,
+        database: str = "postgres",
+    ) -> None:
+        self.latency = latency
+        self.database = database
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.store = Store()
+        self.requests: Counter[str] = Counter()
+        self.url = ""
+        self._runner: web.AppRunner | None = None
+
+    @property
+    def calls(self) -> int:
+        """Total number of requests served"""
+        return sum(self.requests.values())
+
+    def reset_stats(self) -> None:
+        self.requests.clear()
+
+    def reset(self) -> None:
+        self.store = Store()
+        self.reset_stats()
+
+    def seed(self, name: str, entries: Iterable[dict]) -> int:
+        """Add entities of a type to the store without going through the API
+
+        Large states are loaded much faster than with one request per entity
+        """
+        schema = SCHEMAS[name]
+        entities = [self.build(schema, dict(data)) for data in entries]
+        self.store.extend(schema, entities)
+        return len(entities)
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self.middleware])
+        app.router.add_get("/", self.info)
+        app.router.add_get("/status", self.status)
+        app.router.add_post("/config", self.config)
+        app.router.add_route("*", "/{path:.+}", self.dispatch)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start serving and return the admin URL"""
+        self._runner = web.AppRunner(self.app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        sockets = getattr(site._server, "sockets", None) or ()
+        port = sockets[0].getsockname()[1] if sockets else port
+        self.url = f"http://{host}:{port}"
+        return self.url
+
+    async def stop(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> FakeKong:
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.stop()
+
+    # middleware
+
+    @web.middleware
+    async def middleware(
+        self, request: web.Request, handler: Handler
+    ) -> web.StreamResponse:
+        self.requests[request.method] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.error_rate and self.random.random() < self.error_rate:
+            return web.json_response({"message": "injected failure"}, status=503)
+        try:
+            return await handler(request)
+        except FakeError as exc:
+            return web.json_response(exc.body, status=exc.status)
+
+    # handlers
+
+    async def info(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            {"version": "3.8.0", "configuration": {"database": self.database}}
+        )
+
+    async def status(self, request: web.Request) -> web.Response:
+        return web.json_response({"database": {"reachable": True}})
+
+    async def config(self, request: web.Request) -> web.Response:
+        document = await request.json()
+        if isinstance(document.get("config"), str):
+            document = json.loads(document["config"])
+        store = Store()
+        Declarative(store).load(document)
+        self.store = store
+        return web.json_response(store.count(), status=201)
+
+    async def dispatch(self, request: web.Request) -> web.StreamResponse:
+        parts = request.match_info["path"].strip("/").split("/")
+        parent: tuple[Schema, dict] | None = None
+        if len(parts) > 2:
+            if len(parts) > 4 or parts[0] not in PATHS:
+                raise not_found()
+            parent_schema = PATHS[parts[0]]
+            parent = (parent_schema, self.store.get(parent_schema, parts[1]))
+            parts = parts[2:]
+            schema = NESTED_PATHS.get(parts[0])
+        else:
+            schema = PATHS.get(parts[0])
+        if schema is None:
+            raise not_found()
+        foreign = self.foreign_field(schema, parent)
+        if len(parts) == 1:
+            if request.method == "GET":
+                return self.list(request, schema, foreign)
+            elif request.method == "POST":
+                data = await self.body(request)
+                if foreign:
+                    data[foreign[0]] = {"id": foreign[1]}
+                return web.json_response(self.create(schema, data), status=201)
+            raise FakeError(405, "Method not allowed")
+        key = parts[1]
+        if request.method == "PUT":
+            data = await self.body(request)
+            if foreign:
+                data[foreign[0]] = {"id": foreign[1]}
+            return web.json_response(self.upsert(schema, key, data))
+        entity = self.store.find(schema, key)
+        if (
+            entity
+            and foreign
+            and (entity.get(foreign[0]) or {}).get("id") != foreign[1]
+        ):
+            entity = None
+        if request.method == "DELETE":
+            if entity is None:
+                if foreign:
+                    raise not_found()
+                return web.Response(status=204)
+            self.store.remove(schema, entity)
+            return web.Response(status=204)
+        if entity is None:
+            raise not_found()
+        if request.method == "GET":
+            return web.json_response(entity)
+        elif request.method == "PATCH":
+            data = await self.body(request)
+            return web.json_response(self.update(schema, entity, data))
+        raise FakeError(405, "Method not allowed")
+
+    # operations
+
+    def list(
+        self,
+        request: web.Request,
+        schema: Schema,
+        foreign: tuple[str, str] | None = None,
+    ) -> web.Response:
+        try:
+            size = int(request.query.get("size", DEFAULT_PAGE_SIZE))
+        except ValueError:
+            raise FakeError(400, "size must be an integer") from None
+        if not 0 < size <= MAX_PAGE_SIZE:
+            raise FakeError(
+                400, f"size must be an integer between 1 and {MAX_PAGE_SIZE}"
+            )
+        ids = self.store.children_ids(schema, *foreign) if foreign else None
+        data, offset = self.store.page(
+            schema,
+            request.query.get("offset"),
+            size,
+            ids=ids,
+            tags=request.query.get("tags"),
+        )
+        next_ = None
+        if offset:
+            query = dict(request.query, offset=offset)
+            query.pop("size", None)
+            params = "&".join(f"{k}={v}" for k, v in query.items())
+            next_ = f"{request.path}?{params}"
+        return web.json_response({"data": data, "next": next_, "offset": offset})
+
+    def create(self, schema: Schema, data: dict) -> dict:
+        entity = self.build(schema, data)
+        if entity["id"] in self.store.entities[schema.name]:
+            raise unique_violation("id", entity["id"])
+        entity = self.store.insert(schema, entity)
+        if schema.name == "certificates":
+            self.certificate_snis(entity)
+        return entity
+
+    def update(self, schema: Schema, entity: dict, data: dict) -> dict:
+        data.pop("id", None)
+        merged = dict(entity)
+        for key, value in data.items():
+            if key == "config" and isinstance(value, dict):
+                merged[key] = {**(entity.get(key) or {}), **value}
+            else:
+                merged[key] = value
+        merged.pop("updated_at", None)
+        built = self.build(schema, merged, entity)
+        return self.store.replace(schema, built)
+
+    def upsert(self, schema: Schema, key: str, data: dict) -> dict:
+        existing = self.store.find(schema, key)
+        if not is_uuid(key):
+            if not schema.endpoint_key:
+                raise not_found()
+            data[schema.endpoint_key] = key
+        elif existing is None:
+            data["id"] = str(UUID(key))
+        if existing is None:
+            return self.create(schema, data)
+        data["id"] = existing["id"]
+        data["created_at"] = existing["created_at"]
+        return self.store.replace(schema, self.build(schema, data, existing))
+
+    def build(self, schema: Schema, data: dict, existing: dict | None = None) -> dict:
+        entity = {**schema.defaults, **data}
+        id_ = entity.get("id") or str(uuid4())
+        if not is_uuid(id_):
+            raise schema_violation("id", "expected a valid UUID")
+        entity["id"] = str(UUID(str(id_)))
+        now = int(time.time())
+        entity.setdefault("created_at", now)
+        entity["updated_at"] = now
+        for field in schema.required:
+            if entity.get(field) is None:
+                raise schema_violation(field, "required field missing")
+        for field, (parent, _) in schema.foreign.items():
+            entity[field] = self.reference(SCHEMAS[parent], field, entity.get(field))
+        getattr(self, f"build_{schema.name}", lambda e: None)(entity)
+        return entity
+
+    def reference(self, parent: Schema, field: str, ref: Any) -> dict | None:
+        if ref is None:
+            return None
+        if isinstance(ref, str):
+            ref = {"id": ref} if is_uuid(ref) else {parent.endpoint_key: ref}
+        if not isinstance(ref, dict):
+            raise schema_violation(field, "expected a record")
+        key = ref.get("id") or (parent.endpoint_key and ref.get(parent.endpoint_key))
+        if not key or (target := self.store.find(parent, key)) is None:
+            raise FakeError(
+                400,
+                f"the foreign key '{json.dumps(ref)}' does not reference "
+                f"an existing '{parent.name}' entity.",
+                name="foreign key violation",
+                code=4,
+            )
+        return {"id": target["id"]}
+
+    def build_services(self, entity: dict) -> None:
+        if url := entity.pop("url", None):
+            parsed = urlparse(url)
+            entity["protocol"] = parsed.scheme
+            entity["host"] = parsed.hostname
+            entity["port"] = parsed.port or (443 if parsed.scheme == "https" else 80)
+            entity["path"] = parsed.path or None
+        if not entity.get("host"):
+            raise schema_violation("host", "required field missing")
+        entity["port"] = int(entity["port"])
+
+    def build_routes(self, entity: dict) -> None:
+        matchers = ("methods", "hosts", "headers", "paths", "snis", "sources")
+        if not any(entity.get(m) for m in matchers):
+            raise schema_violation(
+                "@entity",
+                "must set one of 'methods', 'hosts', 'headers', 'paths', 'snis' "
+                "when 'protocols' is 'http'",
+            )
+
+    def build_consumers(self, entity: dict) -> None:
+        if entity.get("username") is None and entity.get("custom_id") is None:
+            raise schema_violation(
+                "@entity", "at least one of these fields must be non-empty"
+            )
+
+    def build_certificates(self, entity: dict) -> None:
+        entity["snis"] = list(entity.get("snis") or ())
+
+    def build_keyauth_credentials(self, entity: dict) -> None:
+        entity["key"] = entity.get("key") or secrets.token_urlsafe(24)
+        entity.setdefault("ttl", None)
+
+    def build_basicauth_credentials(self, entity: dict) -> None:
+        password = entity.get("password")
+        if password is None:
+            raise schema_violation("password", "required field missing")
+        if len(password) != 40:
+            consumer = entity["consumer"]["id"]
+            entity["password"] = hashlib.sha1(
+                f"{password}{consumer}".encode()
+            ).hexdigest()
+        if entity.get("username") is None:
+            raise schema_violation("username", "required field missing")
+
+    def build_jwt_secrets(self, entity: dict) -> None:
+        entity["key"] = entity.get("key") or secrets.token_hex(16)
+        entity["secret"] = entity.get("secret") or secrets.token_hex(16)
+        entity.setdefault("algorithm", "HS256")
+        entity.setdefault("rsa_public_key", None)
+
+    def certificate_snis(self, certificate: dict) -> None:
+        for name in certificate["snis"]:
+            self.create(
+                SCHEMAS["snis"],
+                {"name": name, "certificate": {"id": certificate["id"]}},
+            )
+
+    def foreign_field(
+        self, schema: Schema, parent: tuple[Schema, dict] | None
+    ) -> tuple[str, str] | None:
+        if parent is None:
+            return None
+        parent_schema, entity = parent
+        for field, (name, _) in schema.foreign.items():
+            if name == parent_schema.name:
+                return field, entity["id"]
+        raise not_found()
+
+    async def body(self, request: web.Request) -> dict:
+        if not request.can_read_body:
+            return {}
+        if request.content_type == "application/json":
+            data = await request.json()
+        else:
+            data = {}
+            for key, value in (await request.post()).items():
+                if key.endswith("[]"):
+                    data.setdefault(key[:-2], []).append(value)
+                else:
+                    data[key] = value
+        if not isinstance(data, dict):
+            raise FakeError(400, "expected a JSON object")
+        return data
+
+
+def schema_violation(field: str, message: str) -> FakeError:
+    return FakeError(
+        400,
+        f"schema violation ({field}: {message})",
+        name="schema violation",
+        fields={field: message},
+        code=2,
+    )
+
+
+class Declarative:
+    """Load a declarative configuration document into a store"""
+
+    def __init__(self, store: Store) -> None:
+        self.fake = FakeKong()
+        self.fake.store = store
+
+    def load(self, document: dict) -> None:
+        if "_format_version" not in document:
+            raise FakeError(
+                400, "declarative config is invalid: missing _format_version"
+            )
+        for certificate in document.get("certificates") or ():
+            certificate = dict(certificate)
+            snis = certificate.pop("snis", None) or []
+            entity = self.add("certificates", certificate)
+            for sni in snis:
+                sni = sni if isinstance(sni, dict) else {"name": sni}
+                self.add("snis", {**sni, "certificate": {"id": entity["id"]}})
+        for sni in document.get("snis") or ():
+            self.add("snis", sni)
+        for consumer in document.get("consumers") or ():
+            self.consumer(consumer)
+        for service in document.get("services") or ():
+            self.service(service)
+        for route in document.get("routes") or ():
+            self.route(route)
+        for plugin in document.get("plugins") or ():
+            self.add("plugins", plugin)
+
+    def add(self, name: str, data: dict, **parent: Any) -> dict:
+        data = {**data, **{k: {"id": v["id"]} for k, v in parent.items()}}
+        return self.fake.create(SCHEMAS[name], data)
+
+    def consumer(self, data: dict) -> None:
+        data = dict(data)
+        children = {
+            name: data.pop(name, None) or []
+            for name in (
+                "acls",
+                "keyauth_credentials",
+                "basicauth_credentials",
+                "jwt_secrets",
+                "plugins",
+            )
+        }
+        consumer = self.add("consumers", data)
+        for name, entries in children.items():
+            for entry in entries:
+                self.add(name, entry, consumer=consumer)
+
+    def service(self, data: dict) -> None:
+        data = dict(data)
+        routes = data.pop("routes", None) or []
+        plugins = data.pop("plugins", None) or []
+        service = self.add("services", data)
+        for plugin in plugins:
+            self.add("plugins", plugin, service=service)
+        for route in routes:
+            self.route(route, service=service)
+
+    def route(self, data: dict, **parent: Any) -> None:
+        data = dict(data)
+        plugins = data.pop("plugins", None) or []
+        route = self.add("routes", data, **parent)
+        for plugin in plugins:
+            self.add("plugins", plugin, route=route)
+
+
+async def serve(
+    host: str, port: int, latency: float = 0, error_rate: float = 0
+) -> None:  # pragma: no cover
+    fake = FakeKong(latency=latency, error_rate=error_rate)
+    url = await fake.start(host, port)
+    print(f"Fake Kong Admin API listening on {url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await fake.stop()
+
+
+def main() -> None:  # pragma: no cover
+    parser = argparse.ArgumentParser(description="Fake Kong Admin API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.latency, args.error_rate))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
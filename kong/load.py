@@ -0,0 +1,130 @@
+"""Stream configuration entries from YAML and JSON Lines files
+
+A file holds one or more configurations, as YAML documents or as JSON
+objects one per line, each mapping sections to an entry or a list of
+entries. :func:`load` yields ``(section, entry)`` pairs while parsing, the
+same pairs yielded by :func:`.dump`, so that the entries can be applied by
+:meth:`.Kong.apply_stream` before the rest of the file is read and only one
+entry is held in memory at a time. The C LibYAML parser is used when
+PyYAML is built with it.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Iterator
+
+import yaml
+from yaml.composer import Composer
+from yaml.events import (
+    MappingEndEvent,
+    MappingStartEvent,
+    SequenceEndEvent,
+    SequenceStartEvent,
+    StreamEndEvent,
+)
+
+from .codec import default_codec
+from .components import KongError
+
+FORMATS = ("yaml", "jsonl")
+
+# file suffixes of the JSON Lines format
+JSONL_SUFFIXES = (".jsonl", ".ndjson")
+
+try:
+    BaseLoader: type = yaml.CSafeLoader
+except AttributeError:  # pragma: no cover
+    BaseLoader = yaml.SafeLoader
+
+
+class Loader(BaseLoader, Composer):  # type: ignore[misc, valid-type]
+    """Safe loader composing one node at a time
+
+    The C parser only composes whole documents, the nodes of entries are
+    composed by :class:`yaml.composer.Composer` from the parser events.
+    """
+
+    def __init__(self, stream: Any) -> None:
+        super().__init__(stream)  # type: ignore[call-arg]
+        self.anchors: dict = {}
+
+
+def load(stream: Any, format_: str | None = None) -> Iterator[tuple[str, Any]]:
+    """Yield ``(section, entry)`` pairs of the configurations in a stream
+
+    :param stream: text file or file-like object
+    :param format_: ``yaml`` or ``jsonl``, when None it is inferred from
+        the name of the stream and defaults to ``yaml``
+    """
+    format_ = format_ or stream_format(stream)
+    if format_ == "jsonl":
+        return load_jsonl(stream)
+    if format_ == "yaml":
+        return load_yaml(stream)
+    raise ValueError("Cannot load %s" % format_)
+
+
+def load_config(stream: Any, format_: str | None = None) -> dict:
+    """Load the configurations in a stream in a single configuration
+
+    Entries of sections repeated across configurations are concatenated
+    """
+    config: dict = {}
+    for section, entry in load(stream, format_):
+        config.setdefault(section, []).append(entry)
+    return config
+
+
+def stream_format(stream: Any) -> str:
+    name = str(getattr(stream, "name", ""))
+    return "jsonl" if name.endswith(JSONL_SUFFIXES) else "yaml"
+
+
+def load_yaml(stream: Any) -> Iterator[tuple[str, Any]]:
+    """Yield the entries of YAML documents, composing one entry at a time"""
+    loader = Loader(stream)
+    try:
+        loader.get_event()
+        while not loader.check_event(StreamEndEvent):
+            loader.get_event()
+            if loader.check_event(MappingStartEvent):
+                loader.get_event()
+                while not loader.check_event(MappingEndEvent):
+                    section = construct(loader)
+                    if loader.check_event(SequenceStartEvent):
+                        loader.get_event()
+                        while not loader.check_event(SequenceEndEvent):
+                            yield section, construct(loader)
+                        loader.get_event()
+                    else:
+                        yield section, construct(loader)
+                loader.get_event()
+            elif (document := construct(loader)) is not None:
+                raise KongError("Expected a dict got %s" % type(document).__name__)
+            loader.get_event()
+            # anchors are local to a document
+            loader.anchors = {}
+    finally:
+        loader.dispose()
+
+
+def load_jsonl(stream: Any) -> Iterator[tuple[str, Any]]:
+    """Yield the entries of JSON objects, one per line"""
+    decode = default_codec().decode
+    for line in stream:
+        if not line.strip():
+            continue
+        document = decode(line)
+        if not isinstance(document, dict):
+            raise KongError("Expected a dict got %s" % type(document).__name__)
+        for section, data in document.items():
+            if isinstance(data, list):
+                for entry in data:
+                    yield section, entry
+            else:
+                yield section, data
+
+
+def construct(loader: Loader) -> Any:
+    node = loader.compose_node(None, None)  # type: ignore[arg-type]
+    return loader.construct_document(node)
@@ -0,0 +1,300 @@
+from __future__ import annotations
+
+import time
+from bisect import bisect_left
+from collections import Counter
+from types import SimpleNamespace
+from typing import Any, NamedTuple
+
+from aiohttp import (
+    ClientResponse,
+    ClientSession,
+    TraceConfig,
+    TraceConnectionCreateEndParams,
+    TraceConnectionCreateStartParams,
+    TraceConnectionQueuedEndParams,
+    TraceConnectionQueuedStartParams,
+    TraceRequestChunkSentParams,
+    TraceResponseChunkReceivedParams,
+)
+
+PHASES = ("queue", "connect", "response")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class RequestMetric(NamedTuple):
+    """Metrics of a request to the Admin API
+
+    Latencies are in seconds: ``queue`` is the time spent waiting for a
+    request slot and for a connection of the pool, ``connect`` the time
+    spent resolving the host and opening a new connection and ``response``
+    the remaining time up to the response body being read. ``status`` is 0
+    when no response was received.
+    """
+
+    method: str
+    entity: str
+    status: int
+    bytes_sent: int
+    bytes_received: int
+    queue: float
+    connect: float
+    response: float
+
+
+class RequestTrace:
+    """Collect the metrics of a request while it is executed
+
+    The client marks when a request slot is acquired and when the response
+    is received, the :func:`trace_config` callbacks of the session add the
+    connection timings and the number of bytes transferred.
+    """
+
+    def __init__(self, method: str, entity: str) -> None:
+        self.method = method.upper()
+        self.entity = entity
+        self.start = time.perf_counter()
+        self.acquired_at = self.start
+        self.status = 0
+        self.content_length: int | None = None
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.pool_wait = 0.0
+        self.connect = 0.0
+
+    def acquired(self) -> None:
+        self.acquired_at = time.perf_counter()
+
+    def received(self, response: ClientResponse) -> None:
+        self.status = response.status
+        self.content_length = response.content_length
+
+    def metric(self) -> RequestMetric:
+        elapsed = time.perf_counter() - self.acquired_at
+        return RequestMetric(
+            method=self.method,
+            entity=self.entity,
+            status=self.status,
+            bytes_sent=self.bytes_sent,
+            bytes_received=self.bytes_received or self.content_length or 0,
+            queue=self.acquired_at - self.start + self.pool_wait,
+            connect=self.connect,
+            response=max(elapsed - self.pool_wait - self.connect, 0),
+        )
+
+
+def trace_config() -> TraceConfig:
+    """Session trace configuration feeding the :class:`RequestTrace` passed
+    as ``trace_request_ctx`` of a request
+
+    It is added to the sessions created by clients with metrics, add it to
+    the ``trace_configs`` of a session given to the client to measure
+    connection times and bytes transferred.
+    """
+    config = TraceConfig()
+
+    async def on_queued_start(
+        session: ClientSession,
+        ctx: SimpleNamespace,
+        params: TraceConnectionQueuedStartParams,
+    ) -> None:
+        ctx.queued_at = time.perf_counter()
+
+    async def on_queued_end(
+        session: ClientSession,
+        ctx: SimpleNamespace,
+        params: TraceConnectionQueuedEndParams,
+    ) -> None:
+        if trace := request_trace(ctx):
+            trace.pool_wait += time.perf_counter() - ctx.queued_at
+
+    async def on_create_start(
+        session: ClientSession,
+        ctx: SimpleNamespace,
+        params: TraceConnectionCreateStartParams,
+    ) -> None:
+        ctx.connecting_at = time.perf_counter()
+
+    async def on_create_end(
+        session: ClientSession,
+        ctx: SimpleNamespace,
+        params: TraceConnectionCreateEndParams,
+    ) -> None:
+        if trace := request_trace(ctx):
+            trace.connect += time.perf_counter() - ctx.connecting_at
+
+    async def on_chunk_sent(
+        session: ClientSession,
+        ctx: SimpleNamespace,
+        params: TraceRequestChunkSentParams,
+    ) -> None:
+        if trace := request_trace(ctx):
+            trace.bytes_sent += len(params.chunk)
+
+    async def on_chunk_received(
+        session: ClientSession,
+        ctx: SimpleNamespace,
+        params: TraceResponseChunkReceivedParams,
+    ) -> None:
+        if trace := request_trace(ctx):
+            trace.bytes_received += len(params.chunk)
+
+    config.on_connection_queued_start.append(on_queued_start)
+    config.on_connection_queued_end.append(on_queued_end)
+    config.on_connection_create_start.append(on_create_start)
+    config.on_connection_create_end.append(on_create_end)
+    config.on_request_chunk_sent.append(on_chunk_sent)
+    config.on_response_chunk_received.append(on_chunk_received)
+    return config
+
+
+def request_trace(ctx: SimpleNamespace) -> RequestTrace | None:
+    trace = ctx.trace_request_ctx
+    return trace if isinstance(trace, RequestTrace) else None
+
+
+class MetricsSink:
+    """Receive the metrics of each request executed by a client"""
+
+    def record(self, metric: RequestMetric) -> None:
+        raise NotImplementedError
+
+
+class Histogram:
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        # the last count is for the +Inf bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        result = []
+        total = 0
+        bounds = self.buckets + (float("inf"),)
+        for bound, count in zip(bounds, self.counts, strict=True):
+            total += count
+            result.append(("+Inf" if bound == float("inf") else str(bound), total))
+        return result
+
+
+class InMemoryMetrics(MetricsSink):
+    """Aggregate request metrics in memory
+
+    Requests are counted by method, entity type and status, bytes and
+    latency histograms of each phase are aggregated by method and entity
+    type.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self.requests: Counter[tuple[str, str, int]] = Counter()
+        self.bytes_sent: Counter[tuple[str, str]] = Counter()
+        self.bytes_received: Counter[tuple[str, str]] = Counter()
+        self.latency: dict[tuple[str, str, str], Histogram] = {}
+
+    def record(self, metric: RequestMetric) -> None:
+        key = (metric.method, metric.entity)
+        self.requests[(metric.method, metric.entity, metric.status)] += 1
+        self.bytes_sent[key] += metric.bytes_sent
+        self.bytes_received[key] += metric.bytes_received
+        for phase in PHASES:
+            histogram = self.latency.get((phase, *key))
+            if histogram is None:
+                histogram = self.latency[(phase, *key)] = Histogram(self.buckets)
+            histogram.observe(getattr(metric, phase))
+
+    def stats(self) -> dict[str, Any]:
+        """Total requests, bytes and seconds spent in each phase"""
+        stats: dict[str, Any] = dict(
+            requests=sum(self.requests.values()),
+            errors=sum(n for (_, _, status), n in self.requests.items() if not status),
+            bytes_sent=sum(self.bytes_sent.values()),
+            bytes_received=sum(self.bytes_received.values()),
+        )
+        for phase in PHASES:
+            stats[f"{phase}_seconds"] = sum(
+                h.sum for (p, *_), h in self.latency.items() if p == phase
+            )
+        return stats
+
+    def clear(self) -> None:
+        self.requests.clear()
+        self.bytes_sent.clear()
+        self.bytes_received.clear()
+        self.latency.clear()
+
+
+class PrometheusMetrics(InMemoryMetrics):
+    """Aggregate request metrics and render them in the Prometheus text
+    exposition format
+    """
+
+    def __init__(
+        self,
+        namespace: str = "kong_admin",
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(buckets)
+        self.namespace = namespace
+
+    def render(self) -> str:
+        name = self.namespace
+        lines = [
+            f"# HELP {name}_requests_total Requests to the Kong Admin API",
+            f"# TYPE {name}_requests_total counter",
+        ]
+        for (method, entity, status), count in sorted(self.requests.items()):
+            labels = labels_text(method=method, entity=entity, status=status)
+            lines.append(f"{name}_requests_total{{{labels}}} {count}")
+        lines.extend(
+            (
+                f"# HELP {name}_bytes_total Bytes sent to and received from"
+                " the Kong Admin API",
+                f"# TYPE {name}_bytes_total counter",
+            )
+        )
+        for direction, counter in (
+            ("sent", self.bytes_sent),
+            ("received", self.bytes_received),
+        ):
+            for (method, entity), count in sorted(counter.items()):
+                labels = labels_text(method=method, entity=entity, direction=direction)
+                lines.append(f"{name}_bytes_total{{{labels}}} {count}")
+        lines.extend(
+            (
+                f"# HELP {name}_request_seconds Latency of requests to the Kong"
+                " Admin API by phase",
+                f"# TYPE {name}_request_seconds histogram",
+            )
+        )
+        for (phase, method, entity), histogram in sorted(self.latency.items()):
+            labels = labels_text(phase=phase, method=method, entity=entity)
+            for bound, count in histogram.cumulative():
+                lines.append(
+                    f'{name}_request_seconds_bucket{{{labels},le="{bound}"}} {count}'
+                )
+            lines.append(f"{name}_request_seconds_sum{{{labels}}} {histogram.sum}")
+            lines.append(f"{name}_request_seconds_count{{{labels}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def labels_text(**labels: Any) -> str:
+    return ",".join(f'{key}="{value}"' for key, value in labels.items())
+
+
+def entity_type(path: str) -> str:
+    """Entity type of an Admin API path, the last collection it refers to
+
+    ``/services/abc/routes`` refers to routes, ``/services/abc`` to services.
+    """
+    segments = [s for s in path.split("?", 1)[0].split("/") if s]
+    if not segments:
+        return "root"
+    return segments[-1] if len(segments) % 2 else segments[-2]
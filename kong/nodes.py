@@ -0,0 +1,97 @@
+"""Apply a configuration to several Kong nodes
+
+Each node is applied by its own client sharing the session, and the
+connection pool, of the client fanning out. Every node has its own
+concurrency limit, so a slow node does not hold the request slots of the
+others, and failures are reported per node rather than raised.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+from aiohttp import ClientError
+
+from .components import KongError
+
+if TYPE_CHECKING:
+    from .client import Kong
+
+# errors reported as the failure of a node
+NODE_ERRORS = (KongError, ClientError, asyncio.TimeoutError)
+
+
+class NodeResult(NamedTuple):
+    """Outcome of applying a configuration to a node
+
+    :param url: Admin API URL of the node
+    :param seconds: time taken to apply the configuration, or to fail
+    :param declarative: the configuration was loaded via ``POST /config``
+    :param result: result of the apply when successful
+    :param error: error message when the apply failed
+    """
+
+    url: str
+    seconds: float
+    declarative: bool = False
+    result: Any = None
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def to_dict(self) -> dict:
+        return {k: v for k, v in self._asdict().items() if v is not None}
+
+
+async def is_dbless(cli: Kong) -> bool:
+    """Check if the node of a client runs without a database"""
+    info = await cli.execute(cli.url)
+    return (info.get("configuration") or {}).get("database") == "off"
+
+
+async def apply_node(
+    cli: Kong,
+    config: dict,
+    clear: bool = True,
+    reconcile: bool = False,
+    incremental: bool = False,
+    owner: str | None = None,
+    declarative: bool | None = False,
+    timeout: float | None = None,
+) -> NodeResult:
+    """Apply a configuration to the node of a client
+
+    :param declarative: load the configuration via ``POST /config``, when
+        None DB-less nodes are detected from the node information
+    :param timeout: seconds after which the node is reported as failed
+    """
+    start = time.perf_counter()
+    dbless = bool(declarative)
+
+    async def apply() -> Any:
+        nonlocal dbless
+        if declarative is None:
+            dbless = await is_dbless(cli)
+        if dbless:
+            return await cli.apply_declarative(config)
+        return await cli.apply_json(
+            config,
+            clear=clear,
+            reconcile=reconcile,
+            incremental=incremental,
+            owner=owner,
+        )
+
+    try:
+        result = await asyncio.wait_for(apply(), timeout)
+    except NODE_ERRORS as exc:
+        if isinstance(exc, asyncio.TimeoutError):
+            error = f"timed out after {timeout} seconds"
+        else:
+            error = str(exc) or type(exc).__name__
+        return NodeResult(cli.url, time.perf_counter() - start, dbless, error=error)
+    return NodeResult(cli.url, time.perf_counter() - start, dbless, result)
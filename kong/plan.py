@@ -0,0 +1,228 @@
+"""Dry run plans of configuration changes
+
+A plan is computed by applying a configuration with a client which reads
+the current state from the Admin API but records writes rather than sending
+them. New entities are given their ids on the client side, so the recorded
+writes can be sent later, by :meth:`.Kong.apply_plan`, without reading the
+state again.
+"""
+
+from __future__ import annotations
+
+from itertools import pairwise
+from typing import Any, Mapping, NamedTuple, cast
+from uuid import uuid4
+
+from multidict import MultiDict
+
+from .metrics import entity_type
+
+ACTIONS = {"POST": "create", "PUT": "upsert", "PATCH": "update", "DELETE": "delete"}
+
+# fields entities are addressed by in paths, besides their id
+ENDPOINT_KEYS = {
+    "services": "name",
+    "routes": "name",
+    "consumers": "username",
+    "snis": "name",
+}
+
+# fields identifying an entity in the plan summary
+LABELS = ("name", "username", "group", "key", "custom_id", "paths", "hosts", "id")
+
+
+class Operation(NamedTuple):
+    """A write request to the Admin API
+
+    :param path: path of the request relative to the Admin API URL
+    :param json: JSON body of the request
+    :param data: form body of the request
+    """
+
+    method: str
+    path: str
+    json: dict | None = None
+    data: dict | None = None
+    headers: dict | None = None
+
+    @property
+    def action(self) -> str:
+        return ACTIONS[self.method]
+
+    @property
+    def entity(self) -> str:
+        return entity_type(self.path)
+
+    @property
+    def label(self) -> str:
+        body = self.json or self.data or {}
+        for field in LABELS:
+            if value := body.get(field):
+                return ",".join(value) if isinstance(value, list) else str(value)
+        return self.path.rsplit("/", 1)[-1]
+
+    def request_kwargs(self) -> dict[str, Any]:
+        kwargs: dict[str, Any] = {}
+        if self.json is not None:
+            kwargs["json"] = self.json
+        if self.data is not None:
+            kwargs["data"] = _form(self.data)
+        if self.headers:
+            kwargs["headers"] = self.headers
+        return kwargs
+
+    def to_dict(self) -> dict:
+        return {k: v for k, v in self._asdict().items() if v is not None}
+
+
+class Plan:
+    """Writes an apply would send to the Admin API
+
+    :param clear: the plan removes entities not in the configuration
+    :param reconcile: the plan was computed in reconcile mode
+    :param reads: number of read requests of the apply
+    """
+
+    def __init__(
+        self,
+        clear: bool = True,
+        reconcile: bool = True,
+        reads: int = 0,
+        operations: list[Operation] | None = None,
+    ) -> None:
+        self.clear = clear
+        self.reconcile = reconcile
+        self.reads = reads
+        self.operations = operations or []
+        # ids of the entities the plan creates
+        self.planned: dict[str, dict] = {}
+        # paths of the entities the plan upserts, which may not exist yet
+        self.upserted: dict[str, dict] = {}
+        # planned entities by collection and endpoint key, such as
+        # "consumers/username", for references by endpoint key
+        self.keys: dict[str, dict] = {}
+
+    def __len__(self) -> int:
+        return len(self.operations)
+
+    @property
+    def requests(self) -> int:
+        """Number of requests of the apply, reads and writes"""
+        return self.reads + len(self.operations)
+
+    def summary(self) -> dict:
+        """Entities created, updated and deleted by type and the number of
+        requests the apply makes"""
+        result: dict[str, Any] = {action: {} for action in ACTIONS.values()}
+        for op in self.operations:
+            result[op.action].setdefault(op.entity, []).append(op.label)
+        result = {action: value for action, value in result.items() if value}
+        result["requests"] = dict(
+            read=self.reads, write=len(self.operations), total=self.requests
+        )
+        return result
+
+    def to_dict(self) -> dict:
+        return dict(
+            clear=self.clear,
+            reconcile=self.reconcile,
+            reads=self.reads,
+            operations=[op.to_dict() for op in self.operations],
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict) -> Plan:
+        return cls(
+            clear=data.get("clear", True),
+            reconcile=data.get("reconcile", True),
+            reads=data.get("reads", 0),
+            operations=[Operation(**op) for op in data.get("operations", ())],
+        )
+
+    def intercept(self, path: str, method: str, kw: dict) -> Any:
+        """Record a write or answer a read of a planned entity
+
+        Return None when the request reads the current state and must be sent
+        """
+        method = method.upper() or "GET"
+        segments = path.split("?", 1)[0].strip("/").split("/")
+        if method in ("GET", "HEAD"):
+            self.reads += 1
+            if segments[-1] in self.planned:
+                return self.planned[segments[-1]]
+            if (key := "/".join(segments[-2:])) in self.keys:
+                return self.keys[key]
+            if (upserted := "/" + "/".join(segments)) in self.upserted:
+                return self.upserted[upserted]
+            if any(segment in self.planned for segment in segments) or any(
+                "/".join(pair) in self.keys for pair in pairwise(segments)
+            ):
+                # children of a planned entity
+                return {"data": [], "next": None}
+            return None
+        op = Operation(
+            method,
+            path,
+            json=_body(kw.get("json")),
+            data=_body(kw.get("data")),
+            headers=kw.get("headers"),
+        )
+        if method == "DELETE":
+            self.operations.append(op)
+            return True
+        if op.json is None and op.data is None:
+            op = op._replace(json={})
+        body = op.json if op.json is not None else cast(dict, op.data)
+        if method == "POST":
+            id_ = body.setdefault("id", str(uuid4()))
+            entity = self.planned[id_] = dict(body)
+            if endpoint_key := self.endpoint_key(segments[-1], entity):
+                self.keys[endpoint_key] = entity
+        else:
+            key = segments[-1]
+            entity = dict(self.planned.get(key, {}), **body)
+            entity.setdefault("id", key)
+            if key in self.planned:
+                self.planned[key] = entity
+                if endpoint_key := self.endpoint_key(segments[-2], entity):
+                    self.keys[endpoint_key] = entity
+            elif method == "PUT":
+                # the entity may exist, only reads of the entity are answered
+                self.upserted["/" + "/".join(segments)] = entity
+                if endpoint_key := self.endpoint_key(segments[-2], entity):
+                    self.upserted["/" + endpoint_key] = entity
+        self.operations.append(op)
+        return entity
+
+    def endpoint_key(self, collection: str, entity: dict) -> str | None:
+        """Path of an entity by collection and endpoint key, if it has one"""
+        if (field := ENDPOINT_KEYS.get(collection)) and (key := entity.get(field)):
+            return f"{collection}/{key}"
+        return None
+
+    def is_upserted_child(self, path: str) -> bool:
+        """Check if a path is below an entity the plan upserts"""
+        path = path.split("?", 1)[0]
+        return any(path.startswith(f"{parent}/") for parent in self.upserted)
+
+
+def _body(body: Any) -> dict | None:
+    if body is None:
+        return None
+    if isinstance(body, MultiDict):
+        # repeated form fields are recorded as lists
+        return {
+            key: values if len(values := body.getall(key)) > 1 else values[0]
+            for key in body
+        }
+    return dict(body)
+
+
+def _form(data: Mapping) -> MultiDict:
+    form: MultiDict = MultiDict()
+    for key, value in data.items():
+        if isinstance(value, list):
+            form.extend((key, v) for v in value)
+        else:
+            form.add(key, value)
+    return form
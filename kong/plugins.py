@@ -1,15 +1,17 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, cast
 
 from .components import UUID, CrudComponent, JsonType, KongEntity, KongError
+from .context import ApplyContext
+from .utils import matches
 
 if TYPE_CHECKING:
     from .client import Kong
 
 
 class Plugin(KongEntity):
-    pass
+    __slots__ = ()
 
 
 class Plugins(CrudComponent[Plugin]):
@@ -17,65 +19,121 @@ class Plugins(CrudComponent[Plugin]):
         params = await self.preprocess_parameters(params)
         return await super().create(**params)
 
-    async def apply_json(self, data: JsonType, clear: bool = True) -> list:
+    async def apply_json(
+        self,
+        data: JsonType,
+        clear: bool = True,
+        context: ApplyContext | None = None,
+    ) -> list:
         if not isinstance(data, list):
             data = [data]
-        plugins = await self.get_full_list()
-        if not self.is_entity:
+        context = self.apply_context(context)
+        if self.is_entity:
+            if context.bulk_children:
+                plugins = await context.child_entities(self)
+            else:
+                plugins = await self.get_full_list(**context.scope)
+            if self.is_consumer_plugins:
+                # plugins of a service or route and the consumer are applied
+                # with the service or the route
+                plugins = [
+                    p for p in plugins if not (p.get("service") or p.get("route"))
+                ]
+        else:
+            if context.bulk_children:
+                # the same listing is grouped by service and route for their plugins
+                plugins = [self.wrap(d) for d in await context.listing(self)]
+            else:
+                plugins = await self.get_full_list(**context.scope)
             plugins = [p for p in plugins if self.root_plugin(p)]
         plugin_map = {p["name"]: p for p in plugins}
-        result = []
-        for entry in data:
-            entry = entry.copy()
-            name = entry.pop("name", None)
-            if not name:
-                raise KongError("Plugin name not specified")
-            if name in plugin_map:
-                plugin = plugin_map.pop(name)
-                plugin = await self.update(plugin.id, name=name, **entry)
-            else:
-                plugin = await self.create(name=name, **entry)
-
-            result.append(plugin.data)
+        result = await self.cli.gather(
+            self.apply_entry(entry, plugin_map, context) for entry in data
+        )
         # left over plugins
         if clear:
-            for entry in plugin_map.values():
-                await self.delete(entry["id"])
+            await self.cli.gather(self.delete(p["id"]) for p in plugin_map.values())
         return result
 
+    async def apply_entry(
+        self, entry: dict, plugin_map: dict, context: ApplyContext
+    ) -> dict:
+        entry = entry.copy()
+        name = entry.pop("name", None)
+        if not name:
+            raise KongError("Plugin name not specified")
+        params = context.owned(dict(name=name, **entry))
+        params = await self.preprocess_parameters(params, context)
+        if name in plugin_map:
+            plugin = plugin_map.pop(name)
+            if matches(params, plugin.data):
+                return plugin.data
+            plugin = await super().update(plugin.id, **params)
+        else:
+            plugin = await super().create(**params)
+        return plugin.data
+
+    @property
+    def is_consumer_plugins(self) -> bool:
+        """Plugins of a consumer"""
+        if not self.is_entity:
+            return False
+        return cast(CrudComponent, cast(KongEntity, self.root).root).name == "consumers"
+
     def root_plugin(self, plugin: KongEntity) -> bool:
         return not (
             plugin.get("service") or plugin.get("route") or plugin.get("consumer")
         )
 
-    async def preprocess_parameters(self, params: dict) -> dict:
-        await anonymous(self.cli, params)
+    async def preprocess_parameters(
+        self, params: dict, context: ApplyContext | None = None
+    ) -> dict:
+        """Resolve the entities referenced by the plugin parameters
+
+        :param context: apply run memoizing the lookups of the referenced
+            entities
+        """
+        context = self.apply_context(context)
+        await anonymous(self.cli, params, context)
+        await context.foreign_keys(params, "service", "route", "consumer")
         if preprocessor := PLUGIN_PREPROCESSORS.get(params.get("name", "")):
-            params = await preprocessor(self.cli, params)
+            params = await preprocessor(self.cli, params, context)
         return params
 
     async def update(self, id_: str | UUID, **params: Any) -> Plugin:
         params = await self.preprocess_parameters(params)
         return await super().update(id_, **params)
 
+    async def upsert(self, id_: str | UUID, **params: Any) -> Plugin:
+        params = await self.preprocess_parameters(params)
+        return await super().upsert(id_, **params)
+
 
 class KongEntityWithPlugins(KongEntity):
+    __slots__ = ()
+
     @property
     def plugins(self) -> Plugins:
-        return Plugins(self, Plugin)
+        return self.child(Plugins, Plugin)
 
 
-async def consumer_id_from_username(cli: Kong, params: dict) -> dict:
+async def consumer_id_from_username(
+    cli: Kong, params: dict, context: ApplyContext | None = None
+) -> dict:
     if "id" in (params.get("consumer") or {}):
-        c = await cli.consumers.get(params["consumer"]["id"])
-        params["consumer"]["id"] = c["id"]
+        context = context or ApplyContext(cli)
+        consumer = params["consumer"]
+        consumer["id"] = await context.resolve(cli.consumers, consumer["id"])
     return params
 
 
-async def anonymous(cli: Kong, params: dict) -> dict:
+async def anonymous(
+    cli: Kong, params: dict, context: ApplyContext | None = None
+) -> dict:
     if "config" in params and "anonymous" in params["config"]:
-        c = await cli.consumers.get(params["config"]["anonymous"])
-        params["config"]["anonymous"] = c["id"]
+        context = context or ApplyContext(cli)
+        config = params["config"]
+        config["anonymous"] = await context.resolve(cli.consumers, config["anonymous"])
     return params
 
 
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from aiohttp import ClientConnectionError, ClientResponse
+
+from .components import KongError
+
+# errors raised while connecting or waiting for a response which are retried
+RETRY_ERRORS = (ClientConnectionError, asyncio.TimeoutError)
+
+IDEMPOTENT_METHODS = frozenset(("GET", "HEAD", "OPTIONS", "PUT", "DELETE"))
+
+
+class KongCircuitOpenError(KongError):
+    """Raised without sending the request while the circuit is open"""
+
+
+class RetryPolicy:
+    """Retry policy of requests to the Admin API
+
+    Only idempotent methods, which include ``PUT`` upserts, are retried,
+    after connection errors, timeouts and responses with one of the
+    ``statuses``. The delay between attempts grows exponentially from
+    ``backoff`` up to ``max_backoff`` seconds, reduced by a random
+    ``jitter`` fraction. A ``Retry-After`` header, capped at ``max_backoff``,
+    takes precedence.
+    """
+
+    def __init__(
+        self,
+        attempts: int = 3,
+        backoff: float = 0.1,
+        max_backoff: float = 10,
+        jitter: float = 0.5,
+        statuses: frozenset[int] = frozenset((429, 502, 503, 504)),
+        methods: frozenset[str] = IDEMPOTENT_METHODS,
+    ) -> None:
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.statuses = statuses
+        self.methods = methods
+
+    def delay(
+        self, method: str, attempt: int, response: ClientResponse | None = None
+    ) -> float | None:
+        """Seconds to wait before the next attempt or None not to retry
+
+        :param attempt: number of the attempt which has just failed
+        :param response: response of the attempt, None after an error
+        """
+        if attempt >= self.attempts or method.upper() not in self.methods:
+            return None
+        if response is not None:
+            if response.status not in self.statuses:
+                return None
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                return min(retry_after, self.max_backoff)
+        delay = min(self.backoff * 2 ** (attempt - 1), self.max_backoff)
+        return delay * (1 - self.jitter * random.random())
+
+
+class CircuitBreaker:
+    """Fail fast while the Admin API is down
+
+    The circuit opens after ``failure_threshold`` consecutive failures -
+    connection errors, timeouts and 5xx responses. While open, requests
+    raise :class:`KongCircuitOpenError` without being sent. After
+    ``reset_timeout`` seconds one request is let through to probe the
+    Admin API: its success closes the circuit, its failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def check(self) -> None:
+        """Raise if the circuit is open, let a probe through after the timeout"""
+        if self.opened_at is None:
+            return
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            raise KongCircuitOpenError(
+                "Kong Admin API unavailable after %d consecutive failures"
+                % self.failures
+            )
+        # half open - hold the other requests while this one probes
+        self.opened_at = time.monotonic()
+
+    def record(self, status: int) -> None:
+        if status >= 500:
+            self.failure()
+        else:
+            self.success()
+
+    def success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+
+    def failure(self) -> None:
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return max((date - datetime.now(timezone.utc)).total_seconds(), 0)
@@ -1,46 +1,82 @@
+from itertools import chain
 from typing import cast
 
-from .components import UUID, CrudComponent, JsonType
+from .components import CrudComponent, JsonType, KongEntity
+from .context import ApplyContext
 from .plugins import KongEntityWithPlugins
-from .utils import as_list
+from .utils import as_list, matches
 
 
 class Route(KongEntityWithPlugins):
-    pass
+    __slots__ = ()
 
 
-class Routes(CrudComponent):
+class Routes(CrudComponent[Route]):
     """Kong Routes
 
-    Routes are always associated with a Service
+    Routes are always associated with a Service, their plugins are deleted
+    by Kong together with them
     """
 
-    async def delete(self, id_: str | UUID) -> bool:
-        route = cast(KongEntityWithPlugins, self.wrap({"id": id_}))
-        await route.plugins.delete_all()
-        return await super().delete(id_)
+    async def apply_json(
+        self,
+        data: JsonType,
+        clear: bool = True,
+        context: ApplyContext | None = None,
+    ) -> list[dict]:
+        """Apply a JSON data objects for routes
 
-    async def apply_json(self, data: JsonType, clear: bool = True) -> list[dict]:
+        Existing routes are reconciled in place: named routes are matched by
+        name and unnamed routes by their content, so that unchanged routes
+        and their plugins are not recreated. In reconcile mode the routes of
+        a service are taken from a single listing of all routes.
+        """
         if not isinstance(data, list):
             data = [data]
-        routes = await self.get_list()
-        route_map = {r.name: r for r in routes}
-        result = []
-        for entry in data:
-            name = entry.get("name")
-            route = route_map.pop(name, None) if name else None
-            entry = entry.copy()
-            plugins = entry.pop("plugins", [])
-            as_list("hosts", entry)
-            as_list("paths", entry)
-            as_list("methods", entry)
-            if route:
-                await self.delete(route.id)
-            entity = await self.create(**entry)
-            route = cast(KongEntityWithPlugins, entity)
-            route.data["plugins"] = await route.plugins.apply_json(plugins)
-            result.append(route.data)
+        context = self.apply_context(context)
+        if context.bulk_children and self.is_entity:
+            routes = await context.child_entities(self)
+        else:
+            routes = await self.get_full_list(**context.scope)
+        named = {r.name: r for r in routes if r.name}
+        unnamed = [r for r in routes if not r.name]
+        result = await self.cli.gather(
+            self.apply_entry(entry, named, unnamed, context) for entry in data
+        )
         if clear:
-            for route in route_map.values():
-                await self.delete(route.id)
+            await self.cli.gather(
+                self.delete(r.id) for r in chain(named.values(), unnamed)
+            )
         return result
+
+    async def apply_entry(
+        self,
+        entry: dict,
+        named: dict[str, Route],
+        unnamed: list[Route],
+        context: ApplyContext,
+    ) -> dict:
+        """Apply a route entry together with its plugins"""
+        entry = entry.copy()
+        plugins = entry.pop("plugins", [])
+        as_list("hosts", entry)
+        as_list("paths", entry)
+        as_list("methods", entry)
+        context.owned(entry)
+        route: Route | None
+        if name := entry.get("name"):
+            route = named.pop(name, None)
+        else:
+            route = next((r for r in unnamed if matches(entry, r.data)), None)
+            if route:
+                unnamed.remove(route)
+        if route is None:
+            route = await self.create(**entry)
+        elif not matches(entry, route.data):
+            # replaced, so that fields removed from the configuration are
+            # reset, keeping the id and the plugins of the route
+            if self.is_entity:
+                entry.setdefault("service", {"id": cast(KongEntity, self.root).id})
+            route = await self.upsert(route.id, **entry)
+        route.data["plugins"] = await route.plugins.apply_json(plugins, context=context)
+        return route.data
@@ -1,9 +1,11 @@
 from typing import cast
 
 from .components import UUID, CrudComponent, JsonType, KongError
+from .context import ApplyContext
 from .plugins import KongEntityWithPlugins
 from .routes import Route, Routes
-from .utils import local_ip, uid
+from .tags import content_hash, entity_hash, store_hash, with_hash
+from .utils import local_ip, matches, uid
 
 REMOVE = frozenset(("absent", "remove"))
 LOCAL_HOST = frozenset(("localhost", "127.0.0.1"))
@@ -12,9 +14,11 @@ LOCAL_HOST = frozenset(("localhost", "127.0.0.1"))
 class Service(KongEntityWithPlugins):
     """Object representing a Kong service"""
 
+    __slots__ = ()
+
     @property
     def routes(self) -> Routes:
-        return Routes(self, Route)
+        return self.child(Routes, Route)
 
     @property
     def host(self) -> str:
@@ -29,48 +33,124 @@ class Services(CrudComponent[Service]):
     """Kong Services"""
 
     async def delete(self, id_: str | UUID) -> bool:
+        """Delete a service and its routes - plugins are deleted by Kong"""
         srv = cast(Service, self.wrap({"id": uid(id_)}))
         await srv.routes.delete_all()
-        await srv.plugins.delete_all()
         return await super().delete(id_)
 
-    async def apply_json(self, data: JsonType, clear: bool = True) -> list:
+    async def delete_all(self) -> int:
+        """Delete all services
+
+        The routes of all services are deleted in bulk first, so that each
+        service is then deleted with a single request. Routes without a
+        service are kept.
+        """
+        routes = self.cli.routes
+        route_ids = [r.id async for r in routes.paginate() if r.data.get("service")]
+        await self.cli.gather(routes.delete(id_) for id_ in route_ids)
+        ids = [srv.id async for srv in self.paginate()]
+        delete = super().delete
+        await self.cli.gather(delete(id_) for id_ in ids)
+        return len(ids)
+
+    async def apply_json(
+        self,
+        data: JsonType,
+        clear: bool = True,
+        context: ApplyContext | None = None,
+    ) -> list:
         """Apply a JSON data objects for services"""
         if not isinstance(data, list):
             data = [data]
-        result = []
-        for entry in data:
-            if not isinstance(entry, dict):
-                raise KongError("dictionary required")
-            entry = entry.copy()
-            ensure = entry.pop("ensure", None)
-            name = entry.pop("name", None)
-            id_ = entry.pop("id", None)
-            id_or_name = name or id_
-            routes = entry.pop("routes", [])
-            plugins = entry.pop("plugins", [])
-            host = entry.pop("host", None)
-            if host in LOCAL_HOST:
-                host = local_ip()
-            if ensure in REMOVE:
-                if not id_or_name:
-                    raise KongError(
-                        "Service name or id is required to remove previous services"
-                    )
-                if await self.has(id_or_name):
-                    await self.delete(id_or_name)
-                continue
-            entry.update(host=host)
-            if id_or_name and await self.has(id_or_name):
-                if id_ and name:
-                    entry.update(name=name)
-                entity = await self.update(id_or_name, **entry)
+        context = self.apply_context(context)
+        current = None
+        if context.bulk_children:
+            # list services, routes and plugins of all services upfront
+            current = await context.current(self)
+            await self.cli.gather(
+                (
+                    context.children(self.cli.routes, "service"),
+                    context.children(self.cli.plugins, "service"),
+                    context.children(self.cli.plugins, "route"),
+                )
+            )
+        elif context.reconcile:
+            current = await context.current(self)
+        result = await self.cli.gather(
+            self.apply_entry(entry, context, current) for entry in data
+        )
+        return [srv for srv in result if srv is not None]
+
+    async def apply_entry(
+        self,
+        entry: dict,
+        context: ApplyContext,
+        current: dict[str, Service] | None = None,
+    ) -> Service | None:
+        """Apply a service entry together with its routes and plugins
+
+        Services with a name or id are upserted. When the ``current``
+        services are given, existence is checked against them and the
+        service is written only if it differs. In
+        incremental mode a service with the hash of the entry is skipped,
+        without its routes and plugins in the result.
+        """
+        if not isinstance(entry, dict):
+            raise KongError("dictionary required")
+        digest = content_hash(entry) if context.incremental else None
+        entry = entry.copy()
+        ensure = entry.pop("ensure", None)
+        name = entry.pop("name", None)
+        id_ = entry.pop("id", None)
+        id_or_name = name or id_
+        routes = entry.pop("routes", [])
+        plugins = entry.pop("plugins", [])
+        host = entry.pop("host", None)
+        if host in LOCAL_HOST:
+            host = local_ip()
+        if ensure in REMOVE:
+            if not id_or_name:
+                raise KongError(
+                    "Service name or id is required to remove previous services"
+                )
+            if current is not None:
+                if existing := current.get(id_or_name):
+                    await self.delete(existing.id)
+                    context.discard(self, existing)
+            elif await self.has(id_or_name):
+                await self.delete(id_or_name)
+            return None
+        entry.update(host=host)
+        context.owned(entry)
+        if name:
+            entry.update(name=name)
+        if current is None:
+            if id_or_name:
+                # a single request, without checking if the service exists
+                entity = await self.upsert(id_or_name, **entry)
             else:
-                if name:
-                    entry.update(name=name)
                 entity = await self.create(**entry)
-            srv = cast(Service, entity)
-            srv.data["routes"] = await srv.routes.apply_json(routes)
-            srv.data["plugins"] = await srv.plugins.apply_json(plugins)
-            result.append(srv)
-        return result
+        else:
+            existing = current.get(id_or_name) if id_or_name else None
+            if digest and existing and entity_hash(existing.data) == digest:
+                return existing
+            if digest and "tags" in entry:
+                # the previous hash is replaced once the children are applied
+                previous = entity_hash(existing.data) if existing else None
+                entry["tags"] = with_hash(entry["tags"], previous)
+            if existing is None:
+                entity = await self.create(**entry)
+            elif matches(entry, existing.data):
+                entity = existing
+            else:
+                entity = await self.upsert(existing.id, **entry)
+        srv = cast(Service, context.store(self, entity))
+        srv.data["routes"], srv.data["plugins"] = await self.cli.gather(
+            (
+                srv.routes.apply_json(routes, context=context),
+                srv.plugins.apply_json(plugins, context=context),
+            )
+        )
+        if digest:
+            await store_hash(self, srv, digest)
+        return srv
@@ -1,24 +1,48 @@
 from .components import CrudComponent, JsonType, KongEntity
+from .context import ApplyContext
+from .utils import matches
 
 
 class Sni(KongEntity):
-    pass
+    __slots__ = ()
 
 
 class Snis(CrudComponent[Sni]):
     """Kong SNI API component"""
 
-    async def apply_json(self, data: JsonType, clear: bool = True) -> list:
+    async def apply_json(
+        self,
+        data: JsonType,
+        clear: bool = True,
+        context: ApplyContext | None = None,
+    ) -> list:
         """Apply a JSON data objects for snis - never clear them"""
         if not isinstance(data, list):
             data = [data]
-        result = []
-        for entry in data:
-            entry = entry.copy()
-            name = entry.pop("name")
-            if await self.has(name):
-                sni = await self.update(name, **entry)
-            else:
+        context = self.apply_context(context)
+        current = await context.current(self) if context.reconcile else None
+        return await self.cli.gather(
+            self.apply_entry(entry, current, context) for entry in data
+        )
+
+    async def apply_entry(
+        self,
+        entry: dict,
+        current: dict[str, Sni] | None = None,
+        context: ApplyContext | None = None,
+    ) -> dict:
+        entry = entry.copy()
+        name = entry.pop("name")
+        context = self.apply_context(context)
+        context.owned(entry)
+        await context.foreign_keys(entry, "certificate")
+        if current is not None:
+            if (existing := current.get(name)) is None:
                 sni = await self.create(name=name, **entry)
-            result.append(sni.data)
-        return result
+            elif matches(entry, existing.data):
+                sni = existing
+            else:
+                sni = await self.upsert(name, **entry)
+        else:
+            sni = await self.upsert(name, **entry)
+        return sni.data
@@ -0,0 +1,48 @@
+"""Tags managed by the client
+
+In incremental mode the hash of the configuration entry of a service, or
+of a consumer, is stored as a tag of the entity once the entity and all its
+children have been applied. An entry with the same hash as the current
+entity is skipped together with its children.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import TYPE_CHECKING, Any, Iterable, Mapping
+
+if TYPE_CHECKING:
+    from .components import CrudComponent, KongEntity
+
+HASH_PREFIX = "kongfig-hash:"
+
+
+def content_hash(entry: Any) -> str:
+    """Stable hash of a configuration entry, including nested entries"""
+    body = json.dumps(entry, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(body.encode()).hexdigest()[:32]
+
+
+def entity_hash(data: Mapping) -> str | None:
+    """Hash stored in the tags of an entity"""
+    for tag in data.get("tags") or ():
+        if tag.startswith(HASH_PREFIX):
+            return tag[len(HASH_PREFIX) :]
+    return None
+
+
+def with_hash(tags: Iterable[str] | None, digest: str | None) -> list[str]:
+    """Tags with the hash tag replaced by the tag of ``digest``"""
+    result = [tag for tag in tags or () if not tag.startswith(HASH_PREFIX)]
+    if digest:
+        result.append(f"{HASH_PREFIX}{digest}")
+    return result
+
+
+async def store_hash(component: CrudComponent, entity: KongEntity, digest: str) -> None:
+    """Store the hash of an applied entry in the tags of its entity"""
+    if entity_hash(entity.data) != digest:
+        tags = with_hash(entity.data.get("tags"), digest)
+        updated = await component.update(entity.id, tags=tags)
+        entity.data["tags"] = updated.data.get("tags", tags)
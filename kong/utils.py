@@ -1,9 +1,12 @@
+import asyncio
 import socket
-from typing import Any
+from typing import Any, Awaitable, Iterable, Iterator, Mapping, TypeVar, cast
 from uuid import UUID
 
 from multidict import MultiDict
 
+T = TypeVar("T")
+
 
 def as_list(key: str, data: dict) -> dict:
     if key in data:
@@ -33,6 +36,14 @@ def as_params(*, params: dict | None = None, **kwargs: Any) -> MultiDict:
     return mp
 
 
+def is_uuid(value: Any) -> bool:
+    try:
+        UUID(str(value))
+    except ValueError:
+        return False
+    return True
+
+
 def uid(id_: str | UUID) -> str:
     if isinstance(id_, UUID):
         return str(id_)
@@ -40,3 +51,80 @@ def uid(id_: str | UUID) -> str:
         return str(UUID(id_))
     except ValueError:
         return str(id_)
+
+
+async def gather(aws: Iterable[Awaitable[T]], concurrency: int = 1) -> list[T]:
+    """Await a sequence of awaitables and return their results in order
+
+    When ``concurrency`` is 1 the awaitables are awaited one after the other,
+    otherwise they run as concurrent tasks. On failure the tasks following
+    the failing one are cancelled and the error of the first failing
+    awaitable, in input order, is raised - as in a sequential run.
+    """
+    if concurrency <= 1:
+        remaining = iter(aws)
+        try:
+            return [await aw for aw in remaining]
+        except BaseException:
+            # coroutines created upfront are closed, rather than never awaited
+            for aw in remaining:
+                if asyncio.iscoroutine(aw):
+                    aw.close()
+            raise
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        pending = set(tasks)
+        while pending:
+            await asyncio.wait(pending, return_when=asyncio.FIRST_EXCEPTION)
+            for index, task in enumerate(tasks):
+                if task.done() and not task.cancelled() and task.exception():
+                    for later in tasks[index + 1 :]:
+                        later.cancel()
+                    break
+            pending = {task for task in tasks if not task.done()}
+        errors = [task.exception() for task in tasks if not task.cancelled()]
+        for exc in errors:
+            if exc:
+                raise exc
+        return [task.result() for task in tasks]
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def batches(
+    entries: Iterable[tuple[str, T]], size: int
+) -> Iterator[tuple[str, list[T]]]:
+    """Group consecutive ``(section, entry)`` pairs of the same section in
+    batches of at most ``size`` entries
+    """
+    section: str | None = None
+    batch: list[T] = []
+    for name, entry in entries:
+        if batch and (name != section or len(batch) >= size):
+            yield cast(str, section), batch
+            batch = []
+        section = name
+        batch.append(entry)
+    if batch:
+        yield cast(str, section), batch
+
+
+def matches(desired: Any, current: Any) -> bool:
+    """Check if a desired configuration value is satisfied by the current one
+
+    Mappings match when all the desired keys match, so that server defaults
+    and read-only fields of the current value are ignored. Lists match
+    item by item and any other value must be equal.
+    """
+    if isinstance(desired, Mapping):
+        return isinstance(current, Mapping) and all(
+            matches(value, current.get(key)) for key, value in desired.items()
+        )
+    if isinstance(desired, (list, tuple)):
+        return (
+            isinstance(current, (list, tuple))
+            and len(desired) == len(current)
+            and all(matches(d, c) for d, c in zip(desired, current, strict=True))
+        )
+    return desired == current
@@ -1,17 +1,40 @@
+from collections import Counter
 from pathlib import Path
+from typing import cast
 
 import pytest
 import yaml
+from multidict import MultiDict
 
 from kong.client import Kong, KongError
+from kong.consumers import Consumer
+from kong.plan import Plan
+from kong.tags import content_hash, entity_hash
 
 PATH = Path(__file__).parent / "configs"
 
 
-async def apply(cli: Kong, file_name: str):
+async def apply(cli: Kong, file_name: str, **kwargs):
     with open(PATH / file_name) as fp:
         manifest = yaml.load(fp, Loader=yaml.FullLoader)
-    await cli.apply_json(manifest)
+    await cli.apply_json(manifest, **kwargs)
+
+
+def count_requests(cli: Kong, recorded: list | None = None) -> Counter:
+    """Count the requests of a client by method, and record them as
+    ``(method, path, tags)`` in ``recorded`` when given"""
+    requests: Counter = Counter()
+    execute = cli.execute
+
+    async def counted(url, method="", **kwargs):
+        requests[(method or "get").lower()] += 1
+        if recorded is not None:
+            tags = (kwargs.get("params") or {}).get("tags")
+            recorded.append(((method or "get").lower(), cli.path(url), tags))
+        return await execute(url, method, **kwargs)
+
+    cli.execute = counted  # type: ignore
+    return requests
 
 
 async def test_json(cli: Kong):
@@ -105,6 +128,29 @@ async def test_auth_overwrite(cli: Kong):
     assert len(key_auths) == 1
 
 
+@pytest.mark.parametrize(
+    "auth",
+    [{"type": "jwt", "config": {"secret": "s"}}, {"type": "key-auth", "config": {}}],
+)
+async def test_auth_unique_field_required(cli: Kong, auth: dict):
+    config = {"consumers": [{"username": "admin", "auths": [auth]}]}
+    with pytest.raises(KongError):
+        await cli.apply_json(config)
+    consumer = await cli.consumers.get("admin")
+    assert await consumer.jwts.get_list() == []
+    assert await consumer.keyauths.get_list() == []
+
+
+@pytest.mark.parametrize("reconcile", [False, True])
+async def test_basic_auth_no_op(cli: Kong, reconcile: bool):
+    await apply(cli, "test_auth.yaml", reconcile=reconcile)
+    requests = count_requests(cli)
+    await apply(cli, "test_auth.yaml", reconcile=reconcile)
+    # the hashed password is not compared with the configured one
+    assert "patch" not in requests
+    assert "post" not in requests
+
+
 async def test_ensure_remove(cli: Kong):
     await apply(cli, "test6.yaml")
     assert await cli.services.has("pippo") is True
@@ -118,3 +164,469 @@ async def test_grpc(cli: Kong):
     await apply(cli, "grpc.yaml")
     srv = await cli.services.get("mygrpc")
     assert srv.protocol == "grpc"
+
+
+async def test_json_concurrent(cli: Kong):
+    async with Kong(url=cli.url, concurrency=8) as ccli:
+        await apply(ccli, "test6.yaml")
+        await apply(ccli, "test6.yaml")
+    srv = await cli.services.get("pippo")
+    plugins = await srv.plugins.get_list()
+    assert len(plugins) == 1
+    routes = await srv.routes.get_list()
+    assert len(routes) == 1
+    plugins = await routes[0].plugins.get_list()
+    assert len(plugins) == 3
+    cs = await cli.consumers.get("an-xxxx-test")
+    acls = await cs.acls.get_list()
+    assert len(acls) == 2
+
+
+async def test_reconcile_no_op(cli: Kong):
+    await apply(cli, "test4.yaml")
+    await apply(cli, "test9.yaml")
+    config: dict = {
+        "services": [
+            {
+                "name": "foo",
+                "host": "foo.local",
+                "plugins": [{"name": "cors", "config": {"origins": ["*"]}}],
+            }
+        ]
+    }
+    await cli.apply_json(config)
+    requests = count_requests(cli)
+    await apply(cli, "test4.yaml", reconcile=True)
+    await apply(cli, "test9.yaml", reconcile=True)
+    result = await cli.apply_json(config, reconcile=True)
+    assert set(requests) == {"get"}
+    assert result["services"][0]["plugins"][0]["name"] == "cors"
+    #
+    config["services"][0]["port"] = 8080
+    await cli.apply_json(config, reconcile=True)
+    assert requests["put"] == 1
+    assert "patch" not in requests
+    srv = await cli.services.get("foo")
+    assert srv["port"] == 8080
+
+
+async def test_routes_in_place(cli: Kong):
+    await apply(cli, "test.yaml")
+    srv = await cli.services.get("foo")
+    ids = {r.id for r in await srv.routes.get_list()}
+    requests = count_requests(cli)
+    await apply(cli, "test.yaml")
+    assert requests["delete"] == 0
+    assert requests["post"] == 0
+    assert {r.id for r in await srv.routes.get_list()} == ids
+
+
+async def test_named_route_update(cli: Kong):
+    config: dict = {
+        "services": [
+            {
+                "name": "foo",
+                "host": "foo.local",
+                "routes": [
+                    {
+                        "name": "api",
+                        "paths": "/",
+                        "methods": ["GET"],
+                        "strip_path": False,
+                        "protocols": ["https"],
+                        "plugins": [{"name": "cors"}],
+                    }
+                ],
+            }
+        ]
+    }
+    await cli.apply_json(config)
+    srv = await cli.services.get("foo")
+    [route] = await srv.routes.get_list()
+    [plugin] = await route.plugins.get_list()
+    route_config = config["services"][0]["routes"][0]
+    route_config["paths"] = "/v2"
+    for field in ("methods", "strip_path", "protocols"):
+        route_config.pop(field)
+    await cli.apply_json(config)
+    [updated] = await srv.routes.get_list()
+    assert updated.id == route.id
+    assert updated["paths"] == ["/v2"]
+    # fields removed from the configuration are reset to their defaults
+    assert not updated["methods"]
+    assert updated["strip_path"] is True
+    assert updated["protocols"] == ["http", "https"]
+    [updated_plugin] = await updated.plugins.get_list()
+    assert updated_plugin.id == plugin.id
+
+
+async def test_declarative(cli: Kong):
+    info = await cli.execute(cli.url)
+    if info["configuration"]["database"] != "off":
+        pytest.skip("declarative configuration requires a DB-less node")
+    await apply(cli, "test6.yaml")
+    with open(PATH / "test6.yaml") as fp:
+        await cli.apply_declarative(yaml.safe_load(fp))
+    srv = await cli.services.get("pippo")
+    [route] = await srv.routes.get_list()
+    plugins = {p.name: p for p in await route.plugins.get_list()}
+    consumer = await cli.consumers.get("an-xxxx-test")
+    assert plugins["jwt"]["config"]["anonymous"] == consumer.id
+
+
+async def test_reconcile_consumers(cli: Kong):
+    config: dict = {
+        "consumers": [
+            {
+                "username": f"test-{i}",
+                "groups": ["a", "b", "c"],
+                "auths": [{"type": "key-auth", "config": {"key": f"key-{i}"}}],
+            }
+            for i in range(3)
+        ]
+    }
+    await cli.apply_json(config)
+    requests = count_requests(cli)
+    await cli.apply_json(config, reconcile=True)
+    # consumers, ACLs and key-auth credentials are listed once
+    assert dict(requests) == {"get": 3}
+    #
+    config["consumers"][0]["groups"] = ["a", "d"]
+    config["consumers"][1]["auths"].append(
+        {"type": "key-auth", "config": {"key": "key-x"}}
+    )
+    requests.clear()
+    await cli.apply_json(config, reconcile=True)
+    assert dict(requests) == {"get": 3, "post": 2, "delete": 2}
+    consumer = await cli.consumers.get("test-0")
+    groups = sorted(acl["group"] for acl in await consumer.acls.get_full_list())
+    assert groups == ["a", "d"]
+    consumer = await cli.consumers.get("test-1")
+    assert len(await consumer.keyauths.get_full_list()) == 2
+
+
+@pytest.mark.parametrize("reconcile", [False, True])
+async def test_consumer_acls_pages(cli: Kong, reconcile: bool):
+    cli.page_size = 2
+    config = {"consumers": [{"username": "test-xx", "groups": list("abcde")}]}
+    await cli.apply_json(config, reconcile=reconcile)
+    await cli.apply_json(config, reconcile=reconcile)
+    consumer = await cli.consumers.get("test-xx")
+    assert len(await consumer.acls.get_full_list()) == 5
+
+
+async def test_credentials_index(cli: Kong):
+    auths: list[dict] = [
+        {"type": "key-auth", "config": {"key": f"key-{i}"}} for i in range(5)
+    ]
+    auths.append({"type": "jwt", "config": {"key": "jwt-key", "secret": "a"}})
+    config = {"consumers": [{"username": "test-xx", "auths": auths}]}
+    await cli.apply_json(config)
+    requests = count_requests(cli)
+    await cli.apply_json(config)
+    # the consumer is upserted, its ACLs, key-auth and jwt credentials are read once
+    assert requests["put"] == 1
+    assert requests["get"] == 3
+    assert requests["post"] == 0
+    #
+    auths[-1]["config"]["secret"] = "b"
+    await cli.apply_json(config)
+    consumer = await cli.consumers.get("test-xx")
+    jwts = await consumer.jwts.get_full_list()
+    assert len(jwts) == 1
+    assert jwts[0]["secret"] == "b"
+    assert len(await consumer.keyauths.get_full_list()) == 5
+
+
+async def test_upsert(cli: Kong):
+    config = {
+        "services": [{"name": "test", "host": "example.upstream"}],
+        "consumers": [{"username": "test-xx", "custom_id": "xx"}],
+    }
+    requests = count_requests(cli)
+    await cli.apply_json(config)
+    await cli.apply_json(config)
+    # a single write per entity, whether it exists or not
+    assert requests["put"] == 4
+    assert requests["post"] == requests["patch"] == 0
+    srv = await cli.services.get("test")
+    assert srv.data["host"] == "example.upstream"
+    consumer = await cli.consumers.get("test-xx")
+    assert consumer.data["custom_id"] == "xx"
+
+
+@pytest.mark.parametrize(
+    "options", [{}, {"reconcile": True}, {"owner": "team-a"}, {"incremental": True}]
+)
+async def test_upsert_modes(cli: Kong, options: dict):
+    config: dict = {
+        "services": [{"name": "test", "host": "example.upstream", "path": "/a"}],
+        "consumers": [{"username": "test-xx", "custom_id": "xx"}],
+    }
+    await cli.apply_json(config, **options)
+    config["services"][0] = {"name": "test", "host": "other.upstream"}
+    config["consumers"][0] = {"username": "test-xx", "tags": ["x"]}
+    await cli.apply_json(config, **options)
+    # every mode resets the fields removed from the configuration
+    srv = await cli.services.get("test")
+    assert srv.data["host"] == "other.upstream"
+    assert srv.data["path"] is None
+    consumer = await cli.consumers.get("test-xx")
+    assert consumer.data["custom_id"] is None
+    assert "x" in consumer.data["tags"]
+    if options.get("owner"):
+        assert "team-a" in srv.data["tags"]
+        assert "team-a" in consumer.data["tags"]
+    if options.get("incremental"):
+        assert entity_hash(srv.data) == content_hash(config["services"][0])
+        assert entity_hash(consumer.data) == content_hash(config["consumers"][0])
+
+
+async def test_memoized_references(cli: Kong):
+    consumer = await cli.consumers.create(username="test-xx")
+    config = {
+        "services": [
+            {
+                "name": f"test-{i}",
+                "host": "example.upstream",
+                "plugins": [{"name": "key-auth", "config": {"anonymous": "test-xx"}}],
+            }
+            for i in range(5)
+        ]
+    }
+    requests: list[tuple] = []
+    async with Kong(url=cli.url, concurrency=5) as ccli:
+        count_requests(ccli, requests)
+        # concurrent lookups of the same consumer share a single request
+        result = await ccli.apply_json(config)
+    assert requests.count(("get", "/consumers/test-xx", None)) == 1
+    for service in result["services"]:
+        assert service["plugins"][0]["config"]["anonymous"] == consumer.id
+
+
+async def test_plan(cli: Kong):
+    with open(PATH / "test.yaml") as fp:
+        config = yaml.load(fp, Loader=yaml.FullLoader)
+    plan = await cli.plan_json(config)
+    assert not await cli.services.get_list()
+    summary = plan.summary()
+    assert summary["create"]["services"] == ["foo"]
+    assert len(summary["create"]["routes"]) == 2
+    assert "delete" not in summary
+    # the plan counts the requests of the apply
+    requests = count_requests(cli)
+    await cli.apply_json(config, reconcile=True)
+    assert sum(requests.values()) == plan.requests
+    await cli.delete_all()
+    #
+    # a plan is applied without reading the current state
+    saved = Plan.from_dict(plan.to_dict())
+    requests.clear()
+    await cli.apply_plan(saved)
+    assert sum(requests.values()) == len(plan)
+    assert set(requests) == {"post"}
+    srv = await cli.services.get("foo")
+    assert len(await srv.routes.get_list()) == 2
+    plan = await cli.plan_json(config)
+    assert len(plan) == 0
+
+
+async def test_plan_upsert(cli: Kong):
+    with open(PATH / "test.yaml") as fp:
+        config = yaml.load(fp, Loader=yaml.FullLoader)
+    plan = await cli.plan_json(config, reconcile=False)
+    assert not await cli.services.get_list()
+    summary = plan.summary()
+    assert summary["upsert"]["services"] == ["foo"]
+    assert len(summary["create"]["routes"]) == 2
+    await cli.apply_plan(plan)
+    srv = await cli.services.get("foo")
+    assert len(await srv.routes.get_list()) == 2
+
+
+@pytest.mark.parametrize("reconcile", [True, False])
+async def test_plan_references(cli: Kong, reconcile: bool):
+    with open(PATH / "test6.yaml") as fp:
+        config = yaml.load(fp, Loader=yaml.FullLoader)
+    # consumers created by the plan are referenced by username
+    plan = await cli.plan_json(config, reconcile=reconcile)
+    assert not await cli.consumers.get_list()
+    jwt = next(op for op in plan.operations if op.label == "jwt")
+    consumer_id = "71021cd0-d63f-4459-a872-b365cc4f231d"
+    assert cast(dict, jwt.json)["config"]["anonymous"] == consumer_id
+    await cli.apply_plan(plan)
+    consumer = await cli.consumers.get("an-xxxx-test")
+    assert consumer.id == consumer_id
+    assert len(await cli.plugins.get_list()) == 4
+
+
+async def test_incremental(cli: Kong):
+    config: dict = {
+        "services": [
+            {
+                "name": name,
+                "host": f"{name}.local",
+                "tags": ["team-a"],
+                "routes": [{"name": f"{name}-api", "paths": [f"/{name}"]}],
+                "plugins": [{"name": "cors"}],
+            }
+            for name in ("foo", "bar")
+        ],
+        "consumers": [
+            {
+                "username": "test-xx",
+                "groups": ["a"],
+                "auths": [{"type": "key-auth", "config": {"key": "test-key"}}],
+            }
+        ],
+    }
+    await cli.apply_json(config, incremental=True)
+    srv = await cli.services.get("foo")
+    assert srv["tags"][0] == "team-a"
+    assert entity_hash(srv.data) == content_hash(config["services"][0])
+    consumer = await cli.consumers.get("test-xx")
+    assert entity_hash(consumer.data) == content_hash(config["consumers"][0])
+    #
+    # unchanged entries cost one listing per entity type
+    requests = count_requests(cli)
+    await cli.apply_json(config, incremental=True)
+    assert dict(requests) == {"get": 2}
+    #
+    # a changed entry is applied with its children and its hash replaced
+    config["services"][0]["routes"][0]["paths"] = ["/foo/v2"]
+    requests.clear()
+    await cli.apply_json(config, incremental=True)
+    # the route is replaced and the hash of the service updated
+    assert requests["put"] == requests["patch"] == 1
+    srv = await cli.services.get("foo")
+    routes = await srv.routes.get_list()
+    assert routes[0]["paths"] == ["/foo/v2"]
+    assert srv["tags"] == [
+        "team-a",
+        f"kongfig-hash:{content_hash(config['services'][0])}",
+    ]
+    requests.clear()
+    await cli.apply_json(config, incremental=True)
+    assert dict(requests) == {"get": 2}
+
+
+async def test_owner(cli: Kong):
+    await cli.plugins.create(name="correlation-id")
+    await cli.services.create(name="other", host="other.local")
+    config: dict = {
+        "services": [
+            {
+                "name": "foo",
+                "host": "foo.local",
+                "routes": [{"name": "foo-api", "paths": ["/foo"]}],
+                "plugins": [{"name": "cors"}],
+            }
+        ],
+        "consumers": [
+            {
+                "username": "test-xx",
+                "groups": ["a"],
+                "auths": [{"type": "key-auth", "config": {"key": "test-key"}}],
+            }
+        ],
+        "plugins": [{"name": "request-id"}],
+    }
+    await cli.apply_json(config, owner="team-a")
+    srv = await cli.services.get("foo")
+    assert srv["tags"] == ["team-a"]
+    assert (await srv.routes.get_list())[0]["tags"] == ["team-a"]
+    assert (await srv.plugins.get_list())[0]["tags"] == ["team-a"]
+    consumer = cast(Consumer, await cli.consumers.get("test-xx"))
+    assert consumer["tags"] == ["team-a"]
+    assert (await consumer.acls.get_list())[0]["tags"] == ["team-a"]
+    assert (await consumer.keyauths.get_list())[0]["tags"] == ["team-a"]
+    #
+    # listings are filtered by the owner tag and nothing is written again
+    requests: list[tuple] = []
+    count_requests(cli, requests)
+    await cli.apply_json(config, owner="team-a")
+    assert {method for method, _, _ in requests} == {"get"}
+    for path in ("/services", "/consumers", "/acls", "/key-auths", "/plugins"):
+        assert ("get", path, "team-a") in requests
+    #
+    # plugins not owned are not cleared
+    config["plugins"] = []
+    await cli.apply_json(config, owner="team-a")
+    plugins = {p["name"] for p in await cli.plugins.get_list()}
+    assert plugins == {"correlation-id", "cors"}
+    assert await cli.services.has("other")
+
+
+@pytest.mark.parametrize("incremental", [False, True])
+async def test_owner_children(cli: Kong, incremental: bool):
+    config: dict = {
+        "services": [
+            {
+                "name": "foo",
+                "host": "foo.local",
+                "routes": [{"name": "foo-api", "paths": ["/foo"]}],
+                "plugins": [{"name": "request-id"}],
+            }
+        ]
+    }
+    await cli.apply_json(config, owner="team-a")
+    srv = await cli.services.get("foo")
+    await srv.routes.create(name="other-team", paths=["/other"])
+    await srv.plugins.create(name="cors")
+    config["services"][0]["host"] = "bar.local"
+    await cli.apply_json(config, owner="team-a", incremental=incremental)
+    # routes and plugins not owned are not cleared
+    routes = {r.name for r in await srv.routes.get_list()}
+    assert routes == {"foo-api", "other-team"}
+    plugins = {p["name"] for p in await srv.plugins.get_list()}
+    assert plugins == {"request-id", "cors"}
+
+
+def test_plan_form_fields():
+    plan = Plan()
+    form = MultiDict([("key", "test-key"), ("tags[]", "a"), ("tags[]", "b")])
+    plan.intercept("/consumers/test-xx/key-auth", "post", dict(data=form))
+    saved = Plan.from_dict(plan.to_dict())
+    data = saved.operations[0].request_kwargs()["data"]
+    assert data.getall("tags[]") == ["a", "b"]
+    assert data["key"] == "test-key"
+
+
+async def test_reconcile_children(cli: Kong):
+    config: dict = {
+        "services": [
+            {
+                "name": f"srv-{i}",
+                "host": f"srv-{i}.local",
+                "routes": [
+                    {
+                        "name": f"srv-{i}-api",
+                        "paths": [f"/srv-{i}"],
+                        "plugins": [{"name": "cors"}],
+                    },
+                    {"paths": [f"/srv-{i}/health"]},
+                ],
+                "plugins": [{"name": "correlation-id"}],
+            }
+            for i in range(5)
+        ]
+    }
+    await cli.apply_json(config)
+    #
+    # routes and plugins of all services are listed once
+    requests = count_requests(cli)
+    result = await cli.apply_json(config, reconcile=True)
+    assert dict(requests) == {"get": 3}
+    route = result["services"][0]["routes"][0]
+    assert route["plugins"][0]["name"] == "cors"
+    #
+    # children removed from the configuration are cleared
+    config["services"][1]["routes"] = config["services"][1]["routes"][:1]
+    del config["services"][1]["routes"][0]["plugins"]
+    requests.clear()
+    await cli.apply_json(config, reconcile=True)
+    assert dict(requests) == {"get": 3, "delete": 2}
+    srv = await cli.services.get("srv-1")
+    routes = await srv.routes.get_list()
+    assert len(routes) == 1
+    assert not await routes[0].plugins.get_list()
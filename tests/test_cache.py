@@ -0,0 +1,48 @@
+import time
+
+from kong.cache import EntityCache
+from kong.client import Kong
+from kong.consumers import Consumer
+
+
+def test_lru_ttl(cli: Kong):
+    cache = EntityCache(maxsize=2, ttl=60)
+    a = cli.consumers.wrap({"id": "a", "username": "a"})
+    b = cli.consumers.wrap({"id": "b"})
+    cache.set(a, ("/a", "/alias-a"))
+    cache.set(b, ("/b",))
+    assert len(cache) == 1
+    assert cache.evictions == 1
+    assert cache.get("/a") is None
+    assert cache.get("/b") is b
+    cache.ttl = 0
+    cache.set(a, ("/a",))
+    time.sleep(0.001)
+    assert cache.get("/a") is None
+    assert cache.stats() == dict(size=1, hits=1, misses=2, evictions=1, hit_ratio=1 / 3)
+
+
+async def test_read_through(cli: Kong, consumer: Consumer):
+    cli.cache = cache = EntityCache()
+    c1 = await cli.consumers.get("test-xx")
+    c2 = await cli.consumers.get(consumer.id)
+    assert c1 is c2
+    assert await cli.consumers.has("test-xx") is True
+    assert cache.hits == 2
+    assert cache.misses == 1
+    #
+    await cli.consumers.update(consumer.id, custom_id="foo")
+    c3 = await cli.consumers.get("test-xx")
+    assert c3["custom_id"] == "foo"
+    assert cache.misses == 2
+
+
+async def test_delete_invalidates(cli: Kong, consumer: Consumer):
+    cli.cache = cache = EntityCache()
+    key = await consumer.keyauths.create()
+    await cli.consumers.get("test-xx")
+    await consumer.keyauths.get(key["id"])
+    assert len(cache) == 3
+    await cli.consumers.delete("test-xx")
+    assert len(cache) == 0
+    assert await cli.consumers.has("test-xx") is False
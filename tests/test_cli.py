@@ -34,6 +34,15 @@ def test_plugins():
     assert result.exit_code == 0
 
 
+def test_concurrency():
+    runner = CliRunner()
+    args = ["yaml", "tests/configs/test4.yaml", "--concurrency"]
+    result = runner.invoke(kong, [*args, "4"])
+    assert result.exit_code == 0
+    result = runner.invoke(kong, [*args, "0"])
+    assert result.exit_code == 2
+
+
 def test_bad_config():
     runner = CliRunner()
     result = runner.invoke(kong, ["yaml", "tests/configs/test5.yaml"])
@@ -94,3 +103,29 @@ def test_delete_service():
     assert result.exit_code == 0
     result = runner.invoke(kong, ["services", "-d", "foo"])
     assert result.exit_code == 1
+
+
+def test_plan(tmp_path):
+    runner = CliRunner()
+    path = str(tmp_path / "plan.json")
+    result = runner.invoke(
+        kong, ["yaml", "tests/configs/test4.yaml", "--plan", "--save-plan", path]
+    )
+    assert result.exit_code == 0
+    assert json.loads(result.output)["requests"]["total"] > 0
+    result = runner.invoke(kong, ["apply-plan", path])
+    assert result.exit_code == 0
+    for option in ("--declarative", "--detect-dbless", "--stream"):
+        result = runner.invoke(
+            kong, ["yaml", "tests/configs/test4.yaml", "--plan", option]
+        )
+        assert result.exit_code == 2
+
+
+def test_dump():
+    runner = CliRunner()
+    result = runner.invoke(kong, ["dump", "--format", "json", "--section", "services"])
+    assert result.exit_code == 0
+    assert isinstance(json.loads(result.output), dict)
+    result = runner.invoke(kong, ["dump"])
+    assert result.exit_code == 0
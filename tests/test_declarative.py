@@ -0,0 +1,66 @@
+from pathlib import Path
+
+import pytest
+import yaml
+
+from kong.client import KongError
+from kong.declarative import declarative_config
+from kong.utils import local_ip
+
+PATH = Path(__file__).parent / "configs"
+
+
+def load(file_name: str) -> dict:
+    with open(PATH / file_name) as fp:
+        return yaml.safe_load(fp)
+
+
+def test_services():
+    document = declarative_config(load("test.yaml"))
+    assert document["_format_version"] == "3.0"
+    [srv] = document["services"]
+    assert srv["host"] == local_ip()
+    assert [r["hosts"] for r in srv["routes"]] == [["api.foo.com"], ["doc.foo.com"]]
+    assert [p["name"] for p in srv["plugins"]] == ["cors", "rate-limiting"]
+    assert "consumers" not in document
+
+
+def test_consumer_references():
+    document = declarative_config(load("test6.yaml"))
+    [consumer] = document["consumers"]
+    assert consumer["id"] == "71021cd0-d63f-4459-a872-b365cc4f231d"
+    assert consumer["acls"] == [{"group": "boom"}, {"group": "bam"}]
+    plugins = {p["name"]: p for p in document["services"][0]["routes"][0]["plugins"]}
+    assert plugins["jwt"]["config"]["anonymous"] == consumer["id"]
+    assert plugins["request-termination"]["consumer"] == consumer["id"]
+
+
+def test_credentials():
+    document = declarative_config(load("test_auth.yaml"))
+    [consumer] = document["consumers"]
+    assert (
+        consumer["id"]
+        == declarative_config(load("test_auth.yaml"))["consumers"][0]["id"]
+    )
+    assert consumer["basicauth_credentials"] == [
+        {"username": "admin_creds", "password": "hunter2"}
+    ]
+    assert consumer["keyauth_credentials"] == [{"key": "DonKeyKong"}]
+
+
+def test_ensure_remove():
+    assert declarative_config(load("test7.yaml")) == {"_format_version": "3.0"}
+
+
+def test_errors():
+    with pytest.raises(KongError):
+        declarative_config([])  # type: ignore
+    with pytest.raises(KongError):
+        declarative_config({"foo": []})
+    with pytest.raises(KongError) as e:
+        declarative_config(load("test5.yaml"))
+    assert str(e.value) == "Plugin name not specified"
+    with pytest.raises(KongError):
+        declarative_config(
+            {"plugins": [{"name": "jwt", "config": {"anonymous": "unknown"}}]}
+        )
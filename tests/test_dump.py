@@ -0,0 +1,104 @@
+from kong.client import Kong
+from kong.dump import dump
+
+CONFIG: dict = {
+    "services": [
+        {
+            "name": "test",
+            "host": "example.upstream",
+            "routes": [
+                {"name": "test-route", "paths": ["/test"]},
+                {"hosts": ["test.example.com"]},
+            ],
+            "plugins": [{"name": "cors", "config": {"origins": ["*"]}}],
+        }
+    ],
+    "consumers": [
+        {
+            "username": "test-xx",
+            "groups": ["a", "b"],
+            "auths": [{"type": "key-auth", "config": {"key": "test-key"}}],
+        }
+    ],
+    "plugins": [{"name": "correlation-id"}],
+}
+
+
+async def current(cli: Kong) -> dict:
+    config: dict = {}
+    async for section, entry in dump(cli, window=4):
+        config.setdefault(section, []).append(entry)
+    # routes are listed by id, which changes when they are created again
+    for service in config.get("services", ()):
+        service["routes"].sort(key=lambda route: str(route.get("paths")))
+    return config
+
+
+async def test_dump(cli: Kong):
+    await cli.apply_json(CONFIG)
+    config = await current(cli)
+    assert [s["name"] for s in config["services"]] == ["test"]
+    service = config["services"][0]
+    assert "id" not in service
+    assert len(service["routes"]) == 2
+    assert service["plugins"][0]["config"]["origins"] == ["*"]
+    consumer = config["consumers"][0]
+    assert consumer["groups"] == ["a", "b"]
+    assert consumer["auths"][0]["config"]["key"] == "test-key"
+    assert [p["name"] for p in config["plugins"]] == ["correlation-id"]
+    # the dump restores the same state
+    await cli.delete_all()
+    await cli.apply_json(config)
+    assert await current(cli) == config
+
+
+async def test_dump_empty(cli: Kong):
+    assert await current(cli) == {}
+
+
+async def test_dump_hash_tags(cli: Kong):
+    await cli.apply_json(CONFIG, incremental=True)
+    config = await current(cli)
+    assert "tags" not in config["services"][0]
+    assert "tags" not in config["consumers"][0]
+
+
+async def test_dump_consumer_plugins(cli: Kong):
+    config: dict = {
+        "consumers": [
+            {
+                "username": "test-xx",
+                "auths": [
+                    {
+                        "type": "basic-auth",
+                        "config": {"username": "test-xx", "password": "secret"},
+                    }
+                ],
+                "plugins": [{"name": "request-id"}],
+            }
+        ],
+        "services": [
+            {
+                "name": "test",
+                "host": "example.upstream",
+                "plugins": [
+                    {"name": "cors", "consumer": {"username": "test-xx"}},
+                ],
+            }
+        ],
+    }
+    await cli.apply_json(config)
+    dumped = await current(cli)
+    # plugins keep the consumer they apply to
+    plugins = dumped["services"][0]["plugins"]
+    assert [p["consumer"] for p in plugins] == [{"username": "test-xx"}]
+    consumer = dumped["consumers"][0]
+    assert [p["name"] for p in consumer["plugins"]] == ["request-id"]
+    assert "plugins" not in dumped
+    # hashed passwords are not dumped
+    assert "password" not in consumer["auths"][0]["config"]
+    consumer["auths"][0]["config"]["password"] = "secret"
+    await cli.delete_all()
+    await cli.apply_json(dumped)
+    del consumer["auths"][0]["config"]["password"]
+    assert await current(cli) == dumped
@@ -0,0 +1,84 @@
+import time
+
+import pytest
+
+from kong.client import Kong, KongResponseError
+from kong.fake import FakeKong
+from kong.retry import RetryPolicy
+
+
+async def test_fake_pagination():
+    async with FakeKong() as fake:
+        async with Kong(url=fake.url) as cli:
+            for i in range(25):
+                await cli.consumers.create(username=f"user-{i:02d}")
+            first = await cli.execute(f"{cli.url}/consumers?size=10")
+            assert len(first["data"]) == 10
+            assert first["next"]
+            usernames = [c["username"] async for c in cli.consumers.paginate()]
+            assert len(usernames) == 25
+            assert len(set(usernames)) == 25
+            assert fake.requests["GET"] == 2
+
+
+async def test_fake_errors():
+    async with FakeKong() as fake:
+        async with Kong(url=fake.url) as cli:
+            with pytest.raises(KongResponseError) as exc:
+                await cli.services.get("foo")
+            assert exc.value.status == 404
+            await cli.services.create(name="foo", host="example.upstream")
+            with pytest.raises(KongResponseError) as exc:
+                await cli.services.create(name="foo", host="example.upstream")
+            assert exc.value.status == 409
+            upserted = await cli.execute(
+                f"{cli.url}/services/foo", "put", json=dict(host="other.upstream")
+            )
+            assert upserted["host"] == "other.upstream"
+
+
+async def test_fake_cascade():
+    async with FakeKong() as fake:
+        async with Kong(url=fake.url) as cli:
+            consumer = await cli.consumers.create(username="test")
+            await consumer.acls.create(group="admin")
+            await cli.plugins.create(name="jwt", consumer={"id": consumer.id})
+            await cli.consumers.delete("test")
+            assert await cli.acls.get_list() == []
+            assert await cli.plugins.get_list() == []
+            service = await cli.services.create(name="test", host="example.upstream")
+            await service.routes.create(paths=["/test"])
+            # routes restrict the deletion of their service
+            with pytest.raises(KongResponseError) as exc:
+                await cli.execute(f"{cli.url}/services/test", "delete")
+            assert exc.value.status == 400
+            assert await cli.services.delete("test")
+            assert await cli.routes.get_list() == []
+
+
+async def test_fake_injected_failures():
+    async with FakeKong(latency=0.01, error_rate=1) as fake:
+        async with Kong(url=fake.url) as cli:
+            start = time.monotonic()
+            with pytest.raises(KongResponseError) as exc:
+                await cli.services.get_list()
+            assert exc.value.status == 503
+            assert time.monotonic() - start >= 0.01
+        fake.error_rate = 0.5
+        fake.reset_stats()
+        async with Kong(
+            url=fake.url, retry=RetryPolicy(attempts=20, backoff=0.001)
+        ) as cli:
+            assert await cli.services.get_list() == []
+        assert fake.calls >= 1
+
+
+async def test_fake_seed():
+    async with FakeKong() as fake:
+        assert (
+            fake.seed("consumers", ({"username": f"u{i}"} for i in range(250))) == 250
+        )
+        async with Kong(url=fake.url) as cli:
+            consumers = await cli.consumers.get_full_list()
+            assert len(consumers) == 250
+            assert await cli.consumers.has("u10")
@@ -5,6 +5,7 @@ from uuid import UUID
 import pytest
 
 from kong.client import Kong, KongError
+from kong.services import Service
 
 PATH = os.path.join(os.path.dirname(__file__), "certificates")
 
@@ -136,3 +137,85 @@ async def test_paginate_params(cli, consumer):
     assert len(acls) == 4
     acls = [u async for u in consumer.acls.paginate(size=1)]
     assert len(acls) == 2
+
+
+async def test_delete_all(cli: Kong):
+    for name in ("a", "b", "c"):
+        srv = await cli.services.create(name=name, host="example.upstream")
+        route = await srv.routes.create(paths=[f"/{name}"])
+        await route.plugins.create(name="cors")
+        await srv.plugins.create(name="cors")
+    consumer = await cli.consumers.create(username="test-xx")
+    await consumer.acls.create(group="a")
+    await cli.plugins.create(name="correlation-id")
+    result = await cli.delete_all()
+    assert {name: r["deleted"] for name, r in result.items()} == {
+        "routes": 3,
+        "services": 3,
+        "consumers": 1,
+        "plugins": 1,
+        "certificates": 0,
+    }
+    assert all(r["seconds"] >= 0 for r in result.values())
+    assert await cli.plugins.get_list() == []
+
+
+async def test_delete_service_with_routes(cli: Kong):
+    async with Kong(url=cli.url, concurrency=4) as ccli:
+        srv = await ccli.services.create(name="test", host="example.upstream")
+        for path in ("/a", "/b", "/c"):
+            route = await srv.routes.create(paths=[path])
+            await route.plugins.create(name="cors")
+        await ccli.services.delete("test")
+    assert await cli.services.has("test") is False
+    assert await cli.routes.get_list() == []
+    assert await cli.plugins.get_list() == []
+
+
+async def test_delete_all_services(cli: Kong):
+    srv = await cli.services.create(name="test", host="example.upstream")
+    await srv.routes.create(paths=["/a"])
+    route = await cli.routes.create(paths=["/b"])
+    assert await cli.services.delete_all() == 1
+    # routes without a service are not deleted with the services
+    assert [r.id for r in await cli.routes.get_list()] == [route.id]
+
+
+async def test_paginate_prefetch(cli: Kong):
+    for i in range(7):
+        await cli.consumers.create(username=f"test-{i}")
+    for prefetch in (0, 1, 3):
+        consumers = [
+            c async for c in cli.consumers.paginate(page_size=2, prefetch=prefetch)
+        ]
+        assert len(consumers) == 7
+        assert len({c.id for c in consumers}) == 7
+    pages = [len(p) async for p in cli.consumers.pages(page_size=3)]
+    assert pages == [3, 3, 1]
+    async for consumer in cli.consumers.paginate(page_size=1, prefetch=2):
+        assert consumer.username
+        break
+
+
+async def test_paginate_raw(cli: Kong):
+    for i in range(3):
+        await cli.consumers.create(username=f"test-{i}", custom_id=f"c{i}")
+    raw = [c async for c in cli.consumers.paginate(page_size=2, raw=True)]
+    assert all(type(c) is dict for c in raw)
+    assert len(raw) == 3
+    rows = [
+        c
+        async for c in cli.consumers.paginate(
+            raw=True, fields=("username", "custom_id")
+        )
+    ]
+    assert sorted(rows) == [("test-0", "c0"), ("test-1", "c1"), ("test-2", "c2")]
+
+
+async def test_entity_children(service: Service):
+    assert not hasattr(service, "__dict__")
+    assert service.routes is service.routes
+    assert service.plugins is service.plugins
+    consumer = service.cli.consumers.wrap({"id": "abc"})
+    assert consumer.keyauths is consumer.keyauths
+    assert consumer.keyauths is not consumer.basicauths
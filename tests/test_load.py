@@ -0,0 +1,128 @@
+import io
+import json
+
+import pytest
+import yaml
+from click.testing import CliRunner
+
+from kong.cli import kong
+from kong.client import Kong
+from kong.components import KongError
+from kong.load import Loader, load, load_config
+from kong.utils import batches
+
+YAML = """
+services:
+  - &service
+    name: test
+    host: example.upstream
+    routes:
+      - name: test-route
+        paths: [/test]
+  - <<: *service
+    name: test2
+    routes: []
+consumers:
+  username: test-xx
+---
+plugins:
+  - name: correlation-id
+  - name: cors
+"""
+
+JSONL = """\
+{"services": [{"name": "test", "host": "example.upstream"}]}
+
+{"consumers": {"username": "test-xx"}}
+{"plugins": [{"name": "correlation-id"}, {"name": "cors"}]}
+"""
+
+
+def test_load_yaml():
+    entries = list(load(io.StringIO(YAML)))
+    assert [section for section, _ in entries] == [
+        "services",
+        "services",
+        "consumers",
+        "plugins",
+        "plugins",
+    ]
+    assert entries[1][1]["name"] == "test2"
+    assert entries[1][1]["host"] == "example.upstream"
+    assert entries[2][1] == {"username": "test-xx"}
+
+
+def test_load_jsonl():
+    stream = io.StringIO(JSONL)
+    stream.name = "config.jsonl"
+    config = load_config(stream)
+    assert config == {
+        "services": [{"name": "test", "host": "example.upstream"}],
+        "consumers": [{"username": "test-xx"}],
+        "plugins": [{"name": "correlation-id"}, {"name": "cors"}],
+    }
+
+
+def test_load_errors():
+    assert list(load(io.StringIO("---\n---\n"))) == []
+    with pytest.raises(KongError):
+        list(load(io.StringIO("- a\n- b\n")))
+    with pytest.raises(KongError):
+        list(load(io.StringIO("[1]\n"), "jsonl"))
+    with pytest.raises(ValueError):
+        load(io.StringIO(""), "toml")
+
+
+def test_libyaml():
+    if yaml.__with_libyaml__:
+        assert issubclass(Loader, yaml.CSafeLoader)
+
+
+def test_batches():
+    entries = [("a", 1), ("a", 2), ("a", 3), ("b", 4), ("b", 5), ("a", 6)]
+    assert list(batches(entries, 2)) == [
+        ("a", [1, 2]),
+        ("a", [3]),
+        ("b", [4, 5]),
+        ("a", [6]),
+    ]
+
+
+async def test_apply_stream(cli: Kong):
+    result = await cli.apply_stream(load(io.StringIO(YAML)), batch_size=1)
+    assert result == {"services": 2, "consumers": 1, "plugins": 2}
+    assert {s.name for s in await cli.services.get_list()} == {"test", "test2"}
+    # root plugins are applied in a single batch, and not cleared by each other
+    plugins = await cli.plugins.get_list()
+    assert {p["name"] for p in plugins} == {"correlation-id", "cors"}
+    with pytest.raises(KongError):
+        await cli.apply_stream([("upstreams", {"name": "test"})])
+
+
+async def test_apply_stream_plugins(cli: Kong):
+    stream = io.StringIO(
+        "plugins: [{name: cors}]\n"
+        "---\n"
+        "services: [{name: test, host: example.upstream}]\n"
+        "---\n"
+        "plugins: [{name: request-id}]\n"
+    )
+    result = await cli.apply_stream(load(stream))
+    assert result == {"services": 1, "plugins": 2}
+    # root plugins of all documents are applied once, none is cleared
+    plugins = await cli.plugins.get_list()
+    assert {p["name"] for p in plugins} == {"cors", "request-id"}
+
+
+def test_cli_jsonl(tmp_path):
+    path = tmp_path / "config.jsonl"
+    path.write_text(JSONL)
+    runner = CliRunner()
+    result = runner.invoke(kong, ["yaml", str(path)])
+    assert result.exit_code == 0, result.output
+    assert json.loads(result.output)["consumers"][0]["username"] == "test-xx"
+    result = runner.invoke(kong, ["yaml", str(path), "--stream"])
+    assert result.exit_code == 0, result.output
+    assert json.loads(result.output)["plugins"] == 2
+    result = runner.invoke(kong, ["yaml", str(path), "--format", "yaml"])
+    assert result.exit_code == 1
@@ -0,0 +1,47 @@
+from kong.client import Kong
+from kong.metrics import InMemoryMetrics, PrometheusMetrics, RequestMetric, entity_type
+
+
+def test_entity_type():
+    assert entity_type("/services") == "services"
+    assert entity_type("/services/abc") == "services"
+    assert entity_type("/services/abc/routes?size=100") == "routes"
+    assert entity_type("/consumers/abc/key-auth/xyz") == "key-auth"
+    assert entity_type("/") == "root"
+
+
+async def test_request_metrics(cli: Kong):
+    metrics = InMemoryMetrics()
+    async with Kong(metrics=metrics) as kong:
+        await kong.services.get_list()
+        await kong.services.create(name="test", host="example.upstream")
+        assert not await kong.services.has("foo")
+    assert metrics.requests[("GET", "services", 200)] == 1
+    assert metrics.requests[("POST", "services", 201)] == 1
+    assert metrics.requests[("GET", "services", 404)] == 1
+    assert metrics.bytes_sent[("POST", "services")] > 0
+    assert metrics.bytes_received[("GET", "services")] > 0
+    stats = metrics.stats()
+    assert stats["requests"] == 3
+    assert stats["errors"] == 0
+    # the first request opens the connection, the others reuse it
+    assert stats["connect_seconds"] > 0
+    assert metrics.latency[("connect", "POST", "services")].sum == 0
+
+
+def test_prometheus_text():
+    metrics = PrometheusMetrics(buckets=(0.1, 1))
+    metrics.record(RequestMetric("GET", "routes", 200, 0, 100, 0.2, 0, 0.05))
+    text = metrics.render()
+    assert 'kong_admin_requests_total{method="GET",entity="routes",status="200"} 1' in (
+        text
+    )
+    assert (
+        'kong_admin_bytes_total{method="GET",entity="routes",direction="received"}'
+        " 100"
+    ) in text
+    labels = 'phase="queue",method="GET",entity="routes"'
+    assert f'kong_admin_request_seconds_bucket{{{labels},le="0.1"}} 0' in text
+    assert f'kong_admin_request_seconds_bucket{{{labels},le="1"}} 1' in text
+    assert f'kong_admin_request_seconds_bucket{{{labels},le="+Inf"}} 1' in text
+    assert f"kong_admin_request_seconds_count{{{labels}}} 1" in text
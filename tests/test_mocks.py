@@ -1,6 +1,11 @@
+import asyncio
+import time
+
 import aiohttp
 
 from kong.client import Kong
+from kong.codec import JsonCodec, default_codec
+from kong.fake import FakeKong
 
 
 async def async_mock(*args, **kwargs) -> tuple:
@@ -18,3 +23,50 @@ async def test_request_kwargs():
     kwargs = await cli.execute("...", callback=async_passthrough, bla="foo")
     kwargs.pop("headers")
     assert kwargs == dict(ssl=False, bla="foo")
+
+
+async def test_connection_pool():
+    async with Kong(pool_size=10, pool_size_per_host=5, dns_cache_ttl=300) as cli:
+        connector = cli.get_session().connector
+        assert isinstance(connector, aiohttp.TCPConnector)
+        assert connector.limit == 10
+        assert connector.limit_per_host == 5
+    assert cli.session and cli.session.closed
+
+
+async def test_unix_socket():
+    async with Kong(url="http://kong", unix_socket="/tmp/kong.sock") as cli:
+        assert isinstance(cli.get_session().connector, aiohttp.UnixConnector)
+
+
+async def test_shared_session():
+    async with Kong(concurrency=4) as cli:
+        other = cli.share("http://other:8001", page_size=10)
+        assert other.session is cli.session
+        assert other.url == "http://other:8001"
+        assert other.concurrency == 4
+        assert other.page_size == 10
+        await other.close()
+        assert cli.session and not cli.session.closed
+
+
+async def test_codec():
+    codec = default_codec()
+    body = codec.encode({"name": "test", "tags": ["a"]})
+    assert isinstance(body, bytes)
+    assert codec.decode(body) == {"name": "test", "tags": ["a"]}
+    assert JsonCodec().decode(codec.encode([1], indent=True)) == [1]
+    async with Kong(codec=JsonCodec()) as cli:
+        assert cli.share("http://other:8001").codec is cli.codec
+
+
+async def test_no_concurrency_limit():
+    async with FakeKong(latency=0.1) as fake:
+        async with Kong(url=fake.url) as cli:
+            assert cli.semaphore is None
+            assert cli.share(fake.url).semaphore is None
+            await cli.services.create(name="test", host="example.upstream")
+            start = time.perf_counter()
+            await asyncio.gather(*(cli.services.get("test") for _ in range(10)))
+            # requests of a client without a limit are not queued
+            assert time.perf_counter() - start < 0.5
@@ -0,0 +1,85 @@
+import io
+
+import click
+import pytest
+
+from kong.cli import _yml, _yml_nodes
+from kong.client import Kong
+from kong.fake import FakeKong
+
+CONFIG = {
+    "services": [
+        {
+            "name": "test",
+            "host": "example.upstream",
+            "routes": [{"name": "test-route", "paths": ["/test"]}],
+        }
+    ],
+    "consumers": [{"username": "test-xx", "groups": ["a"]}],
+}
+
+
+async def test_apply_nodes():
+    async with (
+        FakeKong() as node,
+        FakeKong(database="off") as dbless,
+        FakeKong(latency=0.5) as slow,
+    ):
+        async with Kong() as cli:
+            results = await cli.apply_nodes(
+                CONFIG, [node.url, dbless.url, slow.url], declarative=None, timeout=0.2
+            )
+        assert [r.url for r in results] == [node.url, dbless.url, slow.url]
+        ok, declarative, timed_out = results
+        assert ok.ok
+        assert not ok.declarative
+        assert ok.result["services"][0].name == "test"
+        assert declarative.ok
+        assert declarative.declarative
+        assert dbless.requests["POST"] == 1
+        assert dbless.store.count()["routes"] == 1
+        assert not timed_out.ok
+        assert timed_out.error == "timed out after 0.2 seconds"
+        # the slow node does not delay the others
+        assert ok.seconds < 0.2
+        assert declarative.seconds < 0.2
+        # the configuration is not changed by the apply
+        assert CONFIG["consumers"][0]["groups"] == ["a"]
+
+
+async def test_apply_nodes_failure():
+    async with FakeKong() as node:
+        async with Kong() as cli:
+            results = await cli.apply_nodes(
+                CONFIG, [node.url, "http://127.0.0.1:1", node.url]
+            )
+        assert len(results) == 2
+        assert results[0].ok
+        assert not results[1].ok
+        assert results[1].to_dict()["url"] == "http://127.0.0.1:1"
+        assert "result" not in results[1].to_dict()
+
+
+async def test_yml_nodes(capsys):
+    async with FakeKong() as first, FakeKong() as second:
+        yaml = io.StringIO("services:\n  - name: test\n    host: example.upstream\n")
+        await _yml_nodes(yaml, True, (first.url, second.url), concurrency=2)
+        assert first.store.count() == second.store.count() == {"services": 1}
+        assert f'"url": "{second.url}"' in capsys.readouterr().out
+        with pytest.raises(click.ClickException):
+            yaml.seek(0)
+            await _yml_nodes(yaml, True, (first.url, "http://127.0.0.1:1"))
+
+
+async def test_yml_nodes_dbless(capsys):
+    async with FakeKong() as node, FakeKong(database="off") as dbless:
+        yaml = io.StringIO("services:\n  - name: test\n    host: example.upstream\n")
+        # DB-less nodes are only detected on request
+        await _yml_nodes(yaml, False, (node.url, dbless.url))
+        assert '"declarative": true' not in capsys.readouterr().out
+        yaml.seek(0)
+        await _yml_nodes(yaml, False, (node.url, dbless.url), declarative=None)
+        assert '"declarative": true' in capsys.readouterr().out
+        yaml.seek(0)
+        await _yml(yaml, False, dbless.url, declarative=None)
+        assert dbless.requests["POST"] == 2
@@ -0,0 +1,96 @@
+import json
+from typing import Any
+
+import aiohttp
+import pytest
+
+from kong.client import Kong, KongResponseError
+from kong.retry import CircuitBreaker, KongCircuitOpenError, RetryPolicy
+
+
+class MockResponse:
+    def __init__(self, status: int, headers: dict | None = None) -> None:
+        self.status = status
+        self.headers = headers or {}
+        self.url = "http://kong"
+        self.method = "GET"
+
+    async def read(self) -> bytes:
+        return json.dumps({"status": self.status}).encode()
+
+    def raise_for_status(self) -> None:
+        pass
+
+    def release(self) -> None:
+        pass
+
+
+def mock_requests(cli: Kong, *results: Any) -> list:
+    """Replace the session request with one returning results in turn"""
+    calls: list = []
+    results_ = list(results)
+
+    async def request(method: str, url: str, **kwargs: Any) -> Any:
+        calls.append(method)
+        result = results_.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return MockResponse(*result)
+
+    cli.get_session().request = request  # type: ignore
+    return calls
+
+
+async def test_retry_transient_status():
+    async with Kong(retry=RetryPolicy(backoff=0.001)) as cli:
+        calls = mock_requests(cli, (503,), (429, {"Retry-After": "0"}), (200,))
+        assert await cli.execute("http://kong/services") == {"status": 200}
+        assert calls == ["GET", "GET", "GET"]
+
+
+async def test_retry_connection_error():
+    async with Kong(retry=RetryPolicy(backoff=0.001)) as cli:
+        calls = mock_requests(
+            cli, aiohttp.ServerDisconnectedError(), (204,), aiohttp.ClientOSError()
+        )
+        assert await cli.execute("http://kong/services/a", "delete") is True
+        assert calls == ["delete", "delete"]
+
+
+async def test_no_retry():
+    async with Kong(retry=RetryPolicy(attempts=2, backoff=0.001)) as cli:
+        calls = mock_requests(cli, (503,), (503,), (503,))
+        with pytest.raises(KongResponseError):
+            await cli.execute("http://kong/services", "post", json={})
+        with pytest.raises(KongResponseError):
+            await cli.execute("http://kong/services/a", "put", json={})
+        assert calls == ["post", "put", "put"]
+
+
+def test_retry_delay():
+    policy = RetryPolicy(backoff=1, max_backoff=3, jitter=0)
+    assert policy.delay("GET", 1) == 1
+    assert policy.delay("GET", 2) == 2
+    assert policy.delay("GET", 3) is None
+    assert RetryPolicy(5, backoff=1, max_backoff=3, jitter=0).delay("GET", 4) == 3
+    response: Any = MockResponse(503, {"Retry-After": "120"})
+    assert policy.delay("GET", 1, response) == 3
+    assert policy.delay("PATCH", 1) is None
+
+
+async def test_circuit_breaker():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    async with Kong(circuit_breaker=breaker) as cli:
+        calls = mock_requests(cli, aiohttp.ClientOSError(), (500,), (200,))
+        with pytest.raises(aiohttp.ClientOSError):
+            await cli.execute("http://kong/services")
+        with pytest.raises(KongResponseError):
+            await cli.execute("http://kong/services")
+        assert breaker.is_open
+        with pytest.raises(KongCircuitOpenError):
+            await cli.execute("http://kong/services")
+        assert len(calls) == 2
+        # after the reset timeout a probe closes the circuit
+        breaker.reset_timeout = 0
+        assert await cli.execute("http://kong/services") == {"status": 200}
+        assert not breaker.is_open
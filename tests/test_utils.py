@@ -0,0 +1,42 @@
+import asyncio
+
+import pytest
+
+from kong.utils import gather
+
+
+async def delayed(value: int, delay: float, fail: bool = False) -> int:
+    await asyncio.sleep(delay)
+    if fail:
+        raise ValueError(value)
+    return value
+
+
+async def test_gather_order():
+    delays = [0.03, 0.01, 0.02, 0]
+    assert await gather(delayed(i, d) for i, d in enumerate(delays)) == [0, 1, 2, 3]
+    result = await gather((delayed(i, d) for i, d in enumerate(delays)), 4)
+    assert result == [0, 1, 2, 3]
+
+
+async def test_gather_first_error():
+    aws = [delayed(0, 0.02, True), delayed(1, 0, True), delayed(2, 0.01)]
+    with pytest.raises(ValueError) as e:
+        await gather(aws, 3)
+    assert e.value.args == (0,)
+
+
+async def test_gather_cancel_after_error():
+    slow = asyncio.ensure_future(delayed(1, 1))
+    with pytest.raises(ValueError):
+        await gather([delayed(0, 0, True), slow], 2)
+    await asyncio.sleep(0)
+    assert slow.cancelled()
+
+
+async def test_gather_sequential_error():
+    later = delayed(1, 0)
+    with pytest.raises(ValueError):
+        await gather((delayed(0, 0, True), later))
+    # the coroutine following the failing one is closed, not left un-awaited
+    assert later.cr_frame is None